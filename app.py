@@ -1,23 +1,29 @@
-from flask import Flask, request, render_template, jsonify, session
-from datetime import datetime
+from flask import Flask, Response, request, render_template, jsonify, session, url_for, g
 import os
 import logging
 import uuid
-from PIL import Image
-import tensorflow as tf
+import time
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 from config import (
     UPLOAD_FOLDER, AUDIO_MIN_IMAGES,
     ALLOWED_IMAGE_EXTENSIONS, ALLOWED_AUDIO_EXTENSIONS,
     DEBUG, SECRET_KEY,
-    IMAGE_MODEL_PATH, AUDIO_MODEL_PATH,
     LOG_LEVEL, LOG_FORMAT, LOG_FILE,
-    MAX_CONTENT_LENGTH
+    MAX_CONTENT_LENGTH, PIPELINE_WORKERS, DECISION_POLICY, VERIFY_POLICY,
+    REPLAY_CHECK_ENABLED, PRELOAD_MODELS, STREAM_DEFAULT_FRAMES, STREAM_RETRY_AFTER,
+    JOB_RETRY_AFTER, JOB_SSE_KEEPALIVE
 )
-from models.loader import load_models
-from utils.image_processing import process_images, calculate_file_hash
-from utils.audio_processing import process_audio, process_audio_file
-from utils.database import init_db, log_access, log_file_hash
+from utils.uploads import read_upload
+from utils.pipeline import VerificationPipeline
+from utils.replay_cache import ReplayCache
+from utils.streaming import StreamSessionStore, TooManyStreams, StreamTooLarge
+from utils.jobs import JobQueue, QueueFull
+from utils.metrics import REGISTRY, REQUEST_SECONDS, IN_FLIGHT
+from utils.inference import start_warm_up, models_failed, ModelsUnavailable
+from utils.database import init_db
+from utils.audit import AuditWriter
 from utils.security import get_user_ip, is_valid_location
 
 # === Logging Setup ===
@@ -38,18 +44,81 @@ app.config['SECRET_KEY'] = SECRET_KEY
 
 # === DB and Models ===
 init_db()
-try:
-    image_model = tf.keras.models.load_model(IMAGE_MODEL_PATH)
-    audio_model = tf.keras.models.load_model(AUDIO_MODEL_PATH)
-    logging.info("✅ Models loaded successfully")
-except Exception as e:
-    logging.error(f"❌ Model loading error: {e}")
-    raise
+# TensorFlow is never imported on the request path of GET pages; the models
+# load behind get_scheduler(), either here in the background or on first POST.
+# Requests never call the models directly; the scheduler batches across them
+if PRELOAD_MODELS:
+    start_warm_up()
+audit = AuditWriter()
+replay_cache = ReplayCache()
+if REPLAY_CHECK_ENABLED and replay_cache.trust_misses:
+    replay_cache.start_warm_load()
+executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+streams = StreamSessionStore()
+jobs = JobQueue()
+pipeline = VerificationPipeline(audit, replay_cache, executor)
+
+# === Metrics ===
+REGISTRY.register_gauges("gateway_audit", "Audit writer state.", audit.stats)
+REGISTRY.register_gauges("gateway_jobs", "Async job queue state.", jobs.stats)
+REGISTRY.register_gauges("gateway_streams", "Open streaming sessions.", streams.stats)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_endpoint = request.endpoint or "unknown"
+    IN_FLIGHT.inc(endpoint=g.request_endpoint)
+
+# Verification routes answer 503 at once when the models could not be loaded
+MODEL_ENDPOINTS = {'home', 'verify', 'submit_job', 'stream_start', 'stream_frame', 'stream_finish'}
+
+@app.before_request
+def reject_without_models():
+    if request.method == 'POST' and request.endpoint in MODEL_ENDPOINTS and models_failed():
+        return models_unavailable()
+
+@app.after_request
+def record_request_status(response):
+    g.request_status = response.status_code
+    return response
+
+@app.teardown_request
+def stop_request_timer(error=None):
+    if 'request_started' not in g:
+        return
+    IN_FLIGHT.dec(endpoint=g.request_endpoint)
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - g.request_started,
+        endpoint=g.request_endpoint, status=g.get('request_status', 500)
+    )
 
 # === Utility ===
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
+def new_session_folder(session_id):
+    return os.path.join(app.config['UPLOAD_FOLDER'], session_id)
+
+def reject_replay(ctx, replay):
+    pipeline.record_replay(ctx, replay)
+    return jsonify({'error': 'Access Denied: replayed upload detected'}), 403
+
+def server_busy(retry_after):
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+# === Final Result ===
+def verdict_payload(ctx):
+    """Response body and HTTP status of a verified session."""
+    if ctx.final_result == "REAL":
+        return {'redirect': 'https://cats.iku.edu.tr/portal'}, 200
+    return {
+        'error': 'Access Denied',
+        'image_results': ctx.image_results,
+        'audio_result': ctx.audio_result
+    }, 403
+
 # === Home Route ===
 @app.route('/', methods=['GET', 'POST'])
 def home():
@@ -60,154 +129,266 @@ def home():
             logging.warning(f"🚫 Blocked IP: {client_ip}")
             return jsonify({'error': 'Access denied due to invalid network origin.'}), 403
 
+        session_id = str(uuid.uuid4())
+        ctx = pipeline.context(session_id, client_ip, new_session_folder(session_id))
         try:
-            images = request.files.getlist('images')
-            audio = request.files.get('audio')
-            logging.info(f"📥 Received {len(images)} images and audio: {audio is not None}")
-
-            session_id = str(uuid.uuid4())
-            folder_path = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
-            images_path = os.path.join(folder_path, 'images')
-            os.makedirs(images_path, exist_ok=True)
-
-            image_results = process_images(images, image_model, folder_path)
-            image_hash = None
-
-            for idx, label in enumerate(image_results):
-                try:
-                    img_filename = f'image_{idx}_{int(datetime.now().timestamp())}.jpg'
-                    img_path = os.path.join(images_path, img_filename)
-                    img = Image.open(images[idx].stream)
-                    img.save(img_path, format='JPEG', quality=95)
-
-                    img_hash = calculate_file_hash(img_path)
-                    log_file_hash(img_hash, 'image', session_id, label)
-                    if idx == 0:
-                        image_hash = img_hash
-                    logging.info(f"🖼️ Image {idx} saved: {label} → {img_path}")
-                except Exception as e:
-                    logging.error(f"❌ Image {idx} failed: {e}")
-
-            # === Audio Processing ===
-            audio_result = "FAKE"
-            audio_hash = None
-            try:
-                if audio and hasattr(audio, 'filename') and audio.filename:
-                    ext = os.path.splitext(audio.filename)[1].lower()
-                    audio_ext = ext if ext in ['.webm', '.ogg', '.wav', '.mp3'] else '.webm'
-                    audio_path = os.path.join(folder_path, f'audio{audio_ext}')
-                    audio.stream.seek(0)
-                    with open(audio_path, 'wb') as f:
-                        f.write(audio.read())
-
-                    if os.path.getsize(audio_path) >= 1000:
-                        audio_hash = calculate_file_hash(audio_path)
-                        audio_result = process_audio_file(audio_path, audio_model, folder_path)
-                        log_file_hash(audio_hash, 'audio', session_id, audio_result)
-                        logging.info(f"🎤 Audio processed: {audio_result} → {audio_path}")
-                    else:
-                        logging.warning("⚠️ Audio too small or empty.")
-            except Exception as e:
-                logging.error(f"❌ Audio error: {e}")
-
-            # === Final Result Decision ===
-            if image_results.count("REAL") >= 5:
-                image_final = "REAL"
-            else:
-                image_final = "FAKE"
-            final_result = "REAL" if image_final == "REAL" and audio_result == "REAL" else "FAKE"
-
-            log_access(
-                session_id=session_id,
-                ip_address=client_ip,
-                face_result=image_final,
-                audio_result=audio_result,
-                image_hash=image_hash,
-                audio_hash=audio_hash,
-                status="success" if final_result == "REAL" else "denied"
-            )
-
-            if final_result == "REAL":
-                return jsonify({'redirect': 'https://cats.iku.edu.tr/portal'})
-            return jsonify({
-                'error': 'Access Denied',
-                'image_results': image_results,
-                'audio_result': audio_result
-            }), 403
+            # Read and hash every upload once, and reject replays before any model runs
+            replay = pipeline.receive(ctx, request.files.getlist('images'), request.files.get('audio'))
+            if replay:
+                return reject_replay(ctx, replay)
+
+            payload, status_code = verdict_payload(pipeline.run(ctx))
+            return jsonify(payload), status_code
 
+        except ModelsUnavailable:
+            raise
         except Exception as e:
             error_msg = str(e)
             logging.error(f"❌ Unexpected error: {error_msg}")
-            log_access(
-                session_id=session.get('session_id', 'unknown'),
-                ip_address=client_ip,
-                face_result="UNKNOWN",
-                audio_result="UNKNOWN",
-                image_hash=None,
-                audio_hash=None,
-                status="error",
-                error_message=error_msg
-            )
+            pipeline.record_error(ctx, error_msg)
             return jsonify({'error': f'Unexpected server error: {error_msg}'}), 500
 
     return render_template('index.html')
 
+# === Streaming Verification ===
+# The client opens a session, pushes each frame and audio chunk as it is
+# captured, then calls finish; frames are scored while the rest is uploading
+# and finish runs the remaining pipeline stages for the audio.
+def score_stream_frame(stream, upload):
+    label = pipeline.score_frame(upload, stream.vote)
+    # Only the raw bytes are needed until finish; the decoded frame is dropped now
+    upload.image = None
+    return label, upload
+
+def stream_context(stream):
+    return pipeline.context(stream.session_id, stream.client_ip, stream.folder_path, stream.vote)
+
+def unknown_stream():
+    return jsonify({'error': 'Unknown or expired stream session'}), 404
+
+@app.route('/stream/start', methods=['POST'])
+def stream_start():
+    client_ip = get_user_ip(request)
+    if not is_valid_location(client_ip):
+        logging.warning(f"🚫 Blocked IP: {client_ip}")
+        return jsonify({'error': 'Access denied due to invalid network origin.'}), 403
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    try:
+        expected_frames = int(payload.get('frames', STREAM_DEFAULT_FRAMES))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'frames must be an integer'}), 400
+    # Fewer frames than the face vote needs could never pass
+    if expected_frames < DECISION_POLICY.min_real_frames:
+        return jsonify({'error': f'frames must be at least {DECISION_POLICY.min_real_frames}'}), 400
+
+    session_id = str(uuid.uuid4())
+    folder_path = new_session_folder(session_id)
+    images_path = os.path.join(folder_path, 'images')
+    try:
+        stream = streams.open(session_id, client_ip, expected_frames, folder_path, images_path)
+    except TooManyStreams as e:
+        logging.warning(f"🚦 Stream limit reached, rejecting session {session_id}: {e}")
+        return server_busy(STREAM_RETRY_AFTER)
+    logging.info(f"📡 Stream session {session_id} opened for {stream.expected_frames} frames")
+    return jsonify({'session_id': session_id, 'frames': stream.expected_frames})
+
+@app.route('/stream/<session_id>/frame', methods=['POST'])
+def stream_frame(session_id):
+    stream = streams.get(session_id)
+    if stream is None:
+        return unknown_stream()
+    if 'image' not in request.files:
+        return jsonify({'error': 'No image provided'}), 400
+    try:
+        index = int(request.form.get('index', ''))
+    except ValueError:
+        return jsonify({'error': 'index must be an integer'}), 400
+
+    upload = read_upload(request.files['image'])
+    replay = pipeline.find_replay(stream.frame_hashes + [upload.sha256], None, stream.expected_frames)
+    if replay:
+        streams.close(session_id)
+        return reject_replay(stream_context(stream), replay)
+
+    try:
+        stream.add_frame(index, upload, lambda: executor.submit(score_stream_frame, stream, upload))
+    except StreamTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'received': index}), 202
+
+@app.route('/stream/<session_id>/audio', methods=['POST'])
+def stream_audio(session_id):
+    stream = streams.get(session_id)
+    if stream is None:
+        return unknown_stream()
+    chunk = request.files.get('audio')
+    if chunk is None:
+        return jsonify({'error': 'No audio chunk provided'}), 400
+    try:
+        size = stream.add_audio_chunk(chunk.filename, chunk.read())
+    except StreamTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    return jsonify({'received': size}), 202
+
+@app.route('/stream/<session_id>/finish', methods=['POST'])
+def stream_finish(session_id):
+    stream = streams.close(session_id)
+    if stream is None:
+        return unknown_stream()
+
+    ctx = stream_context(stream)
+    try:
+        # Frames were hashed and scored on arrival; the pipeline skips their stages
+        ctx.audio = stream.audio_upload()
+        replay = pipeline.find_replay(stream.frame_hashes, ctx.audio.sha256 if ctx.audio else None,
+                                      stream.expected_frames)
+        if replay:
+            return reject_replay(ctx, replay)
+
+        ctx.image_results, ctx.frames = stream.frame_results()
+        payload, status_code = verdict_payload(pipeline.run(ctx))
+        return jsonify(payload), status_code
+
+    except ModelsUnavailable:
+        raise
+    except Exception as e:
+        error_msg = str(e)
+        logging.error(f"❌ Unexpected error: {error_msg}")
+        pipeline.record_error(ctx, error_msg)
+        return jsonify({'error': f'Unexpected server error: {error_msg}'}), 500
+
+# === Async Verification Jobs ===
+# Same multipart body as POST /, but the request returns a job id at once and
+# the verdict is fetched by polling /jobs/<id> or from its event stream.
+def run_job(ctx):
+    try:
+        return verdict_payload(pipeline.run(ctx))
+    except ModelsUnavailable:
+        return {'error': 'Verification temporarily unavailable'}, 503
+    except Exception as e:
+        pipeline.record_error(ctx, str(e))
+        raise
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    client_ip = get_user_ip(request)
+    if not is_valid_location(client_ip):
+        logging.warning(f"🚫 Blocked IP: {client_ip}")
+        return jsonify({'error': 'Access denied due to invalid network origin.'}), 403
+
+    # Checked before the uploads are read and hashed; submit() below still enforces the limit
+    if not jobs.has_capacity():
+        logging.warning("🚦 Job queue full, rejecting request before reading uploads")
+        return server_busy(JOB_RETRY_AFTER)
+
+    session_id = str(uuid.uuid4())
+    ctx = pipeline.context(session_id, client_ip, new_session_folder(session_id))
+
+    # The request body is gone once we return, so uploads are read here
+    replay = pipeline.receive(ctx, request.files.getlist('images'), request.files.get('audio'))
+    if replay:
+        return reject_replay(ctx, replay)
+
+    try:
+        job = jobs.submit(run_job, ctx)
+    except QueueFull as e:
+        logging.warning(f"🚦 Job queue full, rejecting session {session_id}: {e}")
+        return server_busy(JOB_RETRY_AFTER)
+
+    logging.info(f"📨 Job {job.id} queued for session {session_id}")
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'poll': url_for('job_status', job_id=job.id),
+        'events': url_for('job_events', job_id=job.id)
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+
+    def stream():
+        # One event per status change; comments keep idle proxies from closing the stream
+        seen = None
+        while True:
+            status = job.status if seen is None else job.wait(seen, JOB_SSE_KEEPALIVE)
+            if status == seen:
+                yield ": keep-alive\n\n"
+                continue
+            seen = status
+            yield f"event: {status}\ndata: {json.dumps(job.to_dict())}\n\n"
+            if job.done:
+                break
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 # === Lightweight Verification Endpoint ===
+# One face image and one audio clip through the same pipeline as POST /
 @app.route('/verify', methods=['POST'])
 def verify():
+    client_session = session.get('session_id') or str(uuid.uuid4())
+    session['session_id'] = client_session
+    # Every call gets its own folder; the cookie id only correlates calls from one client
+    verification_id = str(uuid.uuid4())
+    ctx = pipeline.context(verification_id, get_user_ip(request), new_session_folder(verification_id),
+                           policy=VERIFY_POLICY)
+    ctx.client_session = client_session
     try:
-        session_id = session.get('session_id') or str(uuid.uuid4())
-        session['session_id'] = session_id
-        folder_path = os.path.join(UPLOAD_FOLDER, session_id)
-        os.makedirs(folder_path, exist_ok=True)
-
-        # Face
         if 'face' not in request.files:
             return jsonify({'error': 'No face image provided'}), 400
-        face_file = request.files['face']
-        face_path = os.path.join(folder_path, 'face.jpg')
-        face_file.save(face_path)
-        face_hash = calculate_file_hash(face_path)
-        log_file_hash(face_hash, 'face', session_id, 'processed')
-
-        # Audio
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio provided'}), 400
-        audio_file = request.files['audio']
-        audio_result = process_audio(audio_file, audio_model, folder_path)
-
-        audio_path = os.path.join(folder_path, 'audio.webm')
-        audio_hash = calculate_file_hash(audio_path) if os.path.exists(audio_path) else None
-        log_file_hash(audio_hash, 'audio', session_id, audio_result)
 
-        log_access(
-            session_id=session_id,
-            ip_address=get_user_ip(request),
-            face_result="REAL",
-            audio_result=audio_result,
-            image_hash=face_hash,
-            audio_hash=audio_hash,
-            status="success" if audio_result == "REAL" else "denied"
-        )
+        replay = pipeline.receive(ctx, [request.files['face']], request.files['audio'])
+        if replay:
+            return reject_replay(ctx, replay)
 
-        return jsonify({'result': audio_result, 'session_id': session_id})
+        pipeline.run(ctx)
+        return jsonify({
+            'result': ctx.final_result,
+            'face_result': ctx.face_result,
+            'audio_result': ctx.audio_result,
+            'session_id': client_session,
+            'verification_id': verification_id
+        })
 
+    except ModelsUnavailable:
+        raise
     except Exception as e:
         error_msg = str(e)
         logging.error(f"❌ Verification error: {error_msg}")
-        log_access(
-            session_id=session.get('session_id', 'unknown'),
-            ip_address=request.remote_addr,
-            face_result="UNKNOWN",
-            audio_result="UNKNOWN",
-            image_hash=None,
-            audio_hash=None,
-            status="error",
-            error_message=error_msg
-        )
+        pipeline.record_error(ctx, error_msg)
         return jsonify({'error': error_msg}), 500
 
+# === Metrics Endpoint ===
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 # === Error Handlers ===
+def models_unavailable():
+    return jsonify({'error': 'Verification temporarily unavailable'}), 503
+
+@app.errorhandler(ModelsUnavailable)
+def handle_models_unavailable(error):
+    return models_unavailable()
+
 @app.errorhandler(413)
 def request_entity_too_large(error):
     return jsonify({'error': 'File too large'}), 413
@@ -1,15 +1,24 @@
 import os
-import os
+from dataclasses import dataclass, replace
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
 
 # === Paths ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
-DATABASE = os.path.join(BASE_DIR, "access_log.db")
-IMAGE_MODEL_PATH = os.path.join(BASE_DIR, "deepfake_model.h5")
-AUDIO_MODEL_PATH = os.path.join(BASE_DIR, "cnn_spectrogram_model.h5")
+UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(BASE_DIR, "uploads"))
+DATABASE = os.environ.get("DATABASE", os.path.join(BASE_DIR, "access_log.db"))
+DB_BUSY_TIMEOUT = 5  # seconds a writer waits on a locked database before failing
+
+IMAGE_MODEL_PATH = os.environ.get("IMAGE_MODEL_PATH", os.path.join(BASE_DIR, "deepfake_model.h5"))
+AUDIO_MODEL_PATH = os.environ.get("AUDIO_MODEL_PATH", os.path.join(BASE_DIR, "cnn_spectrogram_model.h5"))
+
+# === Audit Writer ===
+AUDIT_QUEUE_SIZE = 10000      # events held in memory before new ones are dropped
+AUDIT_BATCH_SIZE = 200        # verifications written per transaction
+AUDIT_FLUSH_INTERVAL = 0.5    # seconds to wait for a batch to fill
+AUDIT_FLUSH_RETRIES = 2       # extra attempts for a failed batch before writing its events one by one
+AUDIT_RETRY_DELAY = 0.5       # seconds before the first retry, doubled for each further one
 
 # === Image Settings ===
 IMAGE_INPUT_SIZE = (224, 224)
@@ -23,16 +32,119 @@ ALLOWED_AUDIO_EXTENSIONS = {'wav', 'webm', 'ogg'}
 
 
 
+# === Face Detection ===
+# Frames without a detected face are labelled NO_FACE and never reach the model;
+# the rest are cropped to the face plus a margin before preprocessing.
+# Off until rescore.py confirms the thresholds on cropped frames
+FACE_DETECTION_ENABLED = os.environ.get("FACE_DETECTION_ENABLED", "0") == "1"
+FACE_CASCADE_PATH = os.environ.get("FACE_CASCADE_PATH") or None  # default: OpenCV's frontal-face cascade
+FACE_DETECT_WIDTH = 160       # frames are downscaled to this width for detection
+FACE_MIN_SIZE_RATIO = 0.2     # smallest face side, relative to the shorter frame side
+FACE_CROP_MARGIN = 0.25       # extra context around the face box, per side, relative to its size
+
+# === Frame Deduplication ===
+# Near-identical frames in one request are scored once and vote once per member
+FRAME_DEDUP_ENABLED = os.environ.get("FRAME_DEDUP_ENABLED", "1") == "1"
+FRAME_DEDUP_MAX_DISTANCE = 4  # differing bits (of 64) in the dHash for two frames to count as duplicates
+
 # === Audio Settings ===
 AUDIO_SAMPLE_RATE = 16000
 AUDIO_DURATION = 5
 AUDIO_IMAGE_SIZE = (224, 224)
 MAX_AUDIO_SIZE_MB = 20
 
+# === Voice Activity Detection ===
+# Leading silence is trimmed and longer clips are scored on at most AUDIO_MAX_WINDOWS
+# AUDIO_DURATION-second windows with the most speech, in one batched model call
+# Off until rescore.py confirms the audio threshold on trimmed clips
+AUDIO_VAD_ENABLED = os.environ.get("AUDIO_VAD_ENABLED", "0") == "1"
+AUDIO_MAX_WINDOWS = 3
+VAD_FRAME_MS = 20             # analysis frame length
+VAD_THRESHOLD_DB = 12         # speech must be this far above the clip's noise floor...
+VAD_MIN_LEVEL_DB = -50        # ...and above this absolute level (dBFS)
+VAD_MIN_SPEECH_MS = 120       # shorter bursts are ignored
+VAD_MAX_GAP_MS = 250          # pauses up to this long stay inside one segment
+VAD_PAD_MS = 100              # context kept around each segment
+VAD_MIN_SCORED_MS = 4000      # trimming never leaves less than this (or the whole clip) to score
+
+# === Inference Backend ===
+# "keras" serves the .h5 models through a traced tf.function; "tflite" converts
+# them once to .tflite (optionally "float16" or "int8" quantized) and serves that
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras")
+TFLITE_QUANTIZATION = os.environ.get("TFLITE_QUANTIZATION") or None
+
+# === Model Warm-up ===
+# Batch sizes pushed through each model at startup (one login chunk is 5 frames x 3 TTA copies)
+MODEL_WARMUP_BATCH_SIZES = (1, 15)
+# Load and warm the models on a background thread at startup; "0" defers it to the first POST
+PRELOAD_MODELS = os.environ.get("PRELOAD_MODELS", "1") == "1"
+
+# === Inference Scheduler ===
+# Rows (frames/spectrograms) per forward pass and how long to wait for other requests to join it
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", 96))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 5))
+# Threads running the face branch of in-flight requests (one per request) and streamed frames
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", 16))
+# TFLite batches are zero-padded up to one of these sizes, so each interpreter allocates
+# its tensors once: one audio window, one frame's 3 TTA copies, then whole 15-row login
+# chunks up to the scheduler's largest batch
+TFLITE_BATCH_SIZES = (1, 3) + tuple(range(15, INFERENCE_MAX_BATCH_SIZE, 15)) + (INFERENCE_MAX_BATCH_SIZE,)
+# Interpreters (and tensor arenas) kept per model; the least recently used size is released
+TFLITE_MAX_INTERPRETERS = int(os.environ.get("TFLITE_MAX_INTERPRETERS", 3))
+
+# === Decision Policy ===
+@dataclass(frozen=True)
+class DecisionPolicy:
+    min_real_frames: int = 5          # face passes when at least this many frames are REAL
+    image_threshold: float = 0.5      # per-frame TTA score needed for REAL
+    audio_threshold: float = 0.8      # spectrogram score needed for REAL
+    frame_chunk_size: int = 5         # frames scored per forward pass before re-checking the vote
+    skip_audio_on_face_fail: bool = True
+
+DECISION_POLICY = DecisionPolicy()
+# /verify sends a single face image, so that one frame decides the face vote
+VERIFY_POLICY = replace(DECISION_POLICY, min_real_frames=1)
+# Names stored with each session (session.json) so rescore.py applies the same policy
+DECISION_POLICIES = {"default": DECISION_POLICY, "verify": VERIFY_POLICY}
+
+# === Replay Detection ===
+REPLAY_CHECK_ENABLED = True
+REPLAY_BLOOM_CAPACITY = 2_000_000   # hashes the filter holds at REPLAY_BLOOM_ERROR_RATE
+REPLAY_BLOOM_ERROR_RATE = 0.001
+REPLAY_LRU_SIZE = 50_000            # recent hashes kept with their session/verdict
+# The filter is per process. With several workers a replay can reach a worker that never
+# saw the hash, so lookups go to SQLite (one query per request) and no filter is built;
+# "1" builds and warms the filter and trusts its misses (single worker only)
+REPLAY_TRUST_BLOOM_MISSES = os.environ.get("REPLAY_TRUST_BLOOM_MISSES", "0") == "1"
+# A seen audio clip alone marks a replay; frames need this many distinct seen hashes,
+# since identical degenerate frames (e.g. an all-black canvas) collide across users
+REPLAY_MIN_FRAME_MATCHES = 3
+
+# === Streaming Verification ===
+# Sessions live in the worker process that opened them (use sticky routing with several workers)
+STREAM_SESSION_TTL = 120            # seconds before an unfinished stream session is dropped
+STREAM_DEFAULT_FRAMES = 15
+STREAM_MAX_FRAMES = 30
+STREAM_MAX_SESSIONS = int(os.environ.get("STREAM_MAX_SESSIONS", 32))  # open sessions before 429
+STREAM_MAX_SESSION_MB = 48          # frame and audio bytes buffered per session
+STREAM_RETRY_AFTER = 2              # Retry-After seconds sent with 429
+
+# === Async Verification Jobs ===
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 8))            # jobs verified concurrently
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", 64))   # queued + running jobs before 429
+JOB_RESULT_TTL = 300                # seconds a finished job stays pollable
+JOB_RETRY_AFTER = 2                 # Retry-After seconds sent with 429
+JOB_SSE_KEEPALIVE = 15              # seconds between keep-alive comments on the event stream
+
+# === Metrics ===
+# Histogram bucket upper bounds: stage/request latency in seconds, and rows per forward pass
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_BATCH_BUCKETS = (1, 3, 5, 15, 30, 45, 60, 96)
+
 # === Security ===
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-fallback-do-not-use-in-production")
 DEBUG = True
 
 
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-LOG_FILE = os.path.join(BASE_DIR, 'app.log')  
+LOG_FILE = os.environ.get("LOG_FILE", os.path.join(BASE_DIR, 'app.log'))  
@@ -0,0 +1,126 @@
+import os
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import TFLITE_QUANTIZATION, TFLITE_BATCH_SIZES, TFLITE_MAX_INTERPRETERS
+
+QUANTIZATION_MODES = (None, "float16", "int8")
+
+
+# === Keras .h5 -> .tflite conversion (cached next to the source model) ===
+def tflite_path(h5_path, quantization=TFLITE_QUANTIZATION):
+    suffix = f".{quantization}" if quantization else ""
+    return f"{os.path.splitext(h5_path)[0]}{suffix}.tflite"
+
+
+def convert_to_tflite(keras_model, out_path, quantization=TFLITE_QUANTIZATION):
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown TFLite quantization: {quantization!r}")
+
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        # Dynamic-range quantization: int8 weights, float activations, no calibration set needed
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    # Written beside the target and renamed into place, so a concurrent reader never sees a partial file
+    flatbuffer = converter.convert()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path) or ".", suffix=".tflite.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(flatbuffer)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logging.info(f"✅ Converted model to TFLite ({quantization or 'float32'}): {out_path}")
+    return out_path
+
+
+def ensure_tflite(h5_path, quantization=TFLITE_QUANTIZATION):
+    """Path of an up-to-date .tflite for ``h5_path``; Keras is only loaded when it must be (re)converted."""
+    out_path = tflite_path(h5_path, quantization)
+    if not os.path.exists(out_path) or os.path.getmtime(out_path) < os.path.getmtime(h5_path):
+        from tensorflow.keras.models import load_model
+        convert_to_tflite(load_model(h5_path), out_path, quantization)
+    return out_path
+
+
+# === TFLite runtime ===
+class TFLiteModel:
+    """Keras-style ``predict`` over ``tf.lite.Interpreter``s, one per fixed batch size.
+
+    Batches are zero-padded up to the next size in ``batch_sizes`` and split when
+    larger than the biggest, so the scheduler's variable batches never trigger a
+    tensor reallocation after the first use of a size. At most ``max_interpreters``
+    sizes stay allocated; the least recently used one is dropped.
+    """
+
+    def __init__(self, model_path, name, num_threads=None, batch_sizes=TFLITE_BATCH_SIZES,
+                 max_interpreters=TFLITE_MAX_INTERPRETERS):
+        self.name = name
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.batch_sizes = tuple(sorted(set(batch_sizes)))
+        self.max_interpreters = max(1, max_interpreters)
+        import tensorflow as tf
+        self._tf = tf
+        probe = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._input = probe.get_input_details()[0]
+        self._output = probe.get_output_details()[0]
+        self.input_shape = tuple(self._input['shape'][1:])
+        self._interpreters = OrderedDict()
+        # An interpreter is not thread-safe; the scheduler uses one thread but be defensive
+        self._lock = threading.Lock()
+
+    def _interpreter(self, size):
+        interpreter = self._interpreters.get(size)
+        if interpreter is None:
+            interpreter = self._tf.lite.Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+            interpreter.resize_tensor_input(self._input['index'], (size, *self.input_shape))
+            interpreter.allocate_tensors()
+            self._interpreters[size] = interpreter
+            if len(self._interpreters) > self.max_interpreters:
+                self._interpreters.popitem(last=False)
+        else:
+            self._interpreters.move_to_end(size)
+        return interpreter
+
+    def predict(self, batch, **kwargs):
+        batch = np.asarray(batch, dtype=np.float32)
+        largest = self.batch_sizes[-1]
+        if len(batch) > largest:
+            return np.concatenate([self.predict(batch[i:i + largest]) for i in range(0, len(batch), largest)])
+
+        size = next(s for s in self.batch_sizes if s >= len(batch))
+        padded = np.zeros((size, *self.input_shape), dtype=np.float32)
+        padded[:len(batch)] = batch
+        with self._lock:
+            interpreter = self._interpreter(size)
+            interpreter.set_tensor(self._input['index'], padded)
+            interpreter.invoke()
+            return interpreter.get_tensor(self._output['index'])[:len(batch)].copy()
+
+    def warm_up(self, batch_sizes):
+        for size in batch_sizes:
+            self.predict(np.zeros((size, *self.input_shape), dtype=np.float32))
+
+
+# === Accuracy check against the Keras baseline ===
+def accuracy_delta(reference_scores, candidate_scores, threshold):
+    """Differences between two backends' (N, 1) scores on the same inputs."""
+    ref = np.asarray(reference_scores)[:, 0]
+    got = np.asarray(candidate_scores)[:, 0]
+    diff = np.abs(ref - got)
+    return {
+        'samples': len(ref),
+        'max_abs_delta': float(diff.max()) if len(diff) else 0.0,
+        'mean_abs_delta': float(diff.mean()) if len(diff) else 0.0,
+        'label_agreement': float(np.mean((ref >= threshold) == (got >= threshold))) if len(ref) else 1.0,
+    }
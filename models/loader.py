@@ -1,7 +1,92 @@
-from tensorflow.keras.models import load_model
-from config import IMAGE_MODEL_PATH, AUDIO_MODEL_PATH
+import time
+import logging
+import threading
+import numpy as np
+from config import (
+    IMAGE_MODEL_PATH, AUDIO_MODEL_PATH,
+    IMAGE_INPUT_SIZE, AUDIO_IMAGE_SIZE,
+    MODEL_WARMUP_BATCH_SIZES, INFERENCE_BACKEND, TFLITE_QUANTIZATION
+)
+from models.backends import TFLiteModel, ensure_tflite
+
+
+class CompiledModel:
+    """Keras model behind one traced ``tf.function`` with a fixed (None, H, W, 3) float32 signature.
+
+    The batch dimension is left open so every batch size reuses the same graph.
+    """
+
+    def __init__(self, model, input_size, name):
+        self.model = model
+        self.name = name
+        self.input_shape = (input_size[1], input_size[0], 3)
+        import tensorflow as tf
+        self._tf = tf
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None, *self.input_shape), tf.float32)],
+        )
+
+    def predict(self, batch, **kwargs):
+        tf = self._tf
+        return self._fn(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+    def warm_up(self, batch_sizes):
+        for size in batch_sizes:
+            self.predict(np.zeros((size, *self.input_shape), dtype=np.float32))
+
+
+class ModelRegistry:
+    """Loads both gateway models once, compiles them for the configured backend and warms them up."""
+
+    def __init__(self, image_path=IMAGE_MODEL_PATH, audio_path=AUDIO_MODEL_PATH,
+                 backend=INFERENCE_BACKEND, quantization=TFLITE_QUANTIZATION):
+        self.image_path = image_path
+        self.audio_path = audio_path
+        self.backend = backend
+        self.quantization = quantization
+        self.image = None
+        self.audio = None
+        self.timings = {}
+
+    def _build(self, path, input_size, name):
+        if self.backend == "keras":
+            from tensorflow.keras.models import load_model
+            return CompiledModel(load_model(path), input_size, name)
+        if self.backend == "tflite":
+            # Keras is only loaded when the cached .tflite is missing or stale
+            return TFLiteModel(ensure_tflite(path, self.quantization), name)
+        raise ValueError(f"Unknown inference backend: {self.backend!r}")
+
+    def load(self, warm_up=True):
+        started = time.perf_counter()
+        self.image = self._build(self.image_path, IMAGE_INPUT_SIZE, "image")
+        self.audio = self._build(self.audio_path, AUDIO_IMAGE_SIZE, "audio")
+        self.timings['load'] = time.perf_counter() - started
+        logging.info(f"✅ Models loaded ({self.backend}) in {self.timings['load']:.2f}s")
+
+        if warm_up:
+            started = time.perf_counter()
+            self.image.warm_up(MODEL_WARMUP_BATCH_SIZES)
+            self.audio.warm_up(MODEL_WARMUP_BATCH_SIZES)
+            self.timings['warm_up'] = time.perf_counter() - started
+            logging.info(f"🔥 Models traced and warmed up in {self.timings['warm_up']:.2f}s")
+        return self
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(warm_up=True):
+    """The process-wide registry; TensorFlow is first imported here, not when this module is."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry().load(warm_up=warm_up)
+    return _registry
+
 
 def load_models():
-    image_model = load_model(IMAGE_MODEL_PATH)
-    audio_model = load_model(AUDIO_MODEL_PATH)
-    return image_model, audio_model
+    registry = get_registry()
+    return registry.image, registry.audio
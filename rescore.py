@@ -0,0 +1,226 @@
+import os
+import csv
+import json
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+import numpy as np
+
+from config import (
+    UPLOAD_FOLDER, IMAGE_MODEL_PATH, AUDIO_MODEL_PATH, DECISION_POLICY, DECISION_POLICIES, LOG_FORMAT,
+    FACE_DETECTION_ENABLED, AUDIO_VAD_ENABLED
+)
+
+# Offline re-scoring of stored sessions (uploads/<session_id>/images/* and
+# uploads/<session_id>/audio.*) with the current models.
+#
+#   decode workers (processes): read + preprocess frames, decode audio -> spectrogram
+#   main process:               batched TTA inference across sessions, CSV rows
+#
+# The CSV doubles as the resume journal: sessions already in it are skipped.
+# Each session is judged with the decision policy named in its session.json
+# (e.g. one REAL frame for /verify); sessions without one use DECISION_POLICY.
+# Usage: python rescore.py --out rescore.csv [--workers 8] [--batch-frames 96] [--parquet rescore.parquet]
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+AUDIO_FILES = ('audio.webm', 'audio.ogg', 'audio.wav', 'audio.mp3')
+FIELDS = [
+    'session_id', 'frames', 'unreadable_frames', 'no_face_frames', 'real_frames', 'mean_frame_score', 'face_result',
+    'audio_score', 'audio_result', 'final_result', 'error', 'image_model', 'audio_model', 'scored_at'
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score stored upload sessions with the current models")
+    parser.add_argument("--uploads", default=UPLOAD_FOLDER, help="uploads tree to walk")
+    parser.add_argument("--out", default="rescore.csv", help="CSV results file (appended to, used for resume)")
+    parser.add_argument("--parquet", help="also write the full results as Parquet (needs pandas + pyarrow)")
+    parser.add_argument("--image-model", default=IMAGE_MODEL_PATH)
+    parser.add_argument("--audio-model", default=AUDIO_MODEL_PATH)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--batch-frames", type=int, default=96, help="frames per image forward pass (x3 with TTA)")
+    parser.add_argument("--limit", type=int, help="stop after this many new sessions")
+    return parser.parse_args()
+
+
+# === Discovery and resume ===
+def find_sessions(uploads):
+    for entry in sorted(os.scandir(uploads), key=lambda e: e.name):
+        if entry.is_dir() and os.path.isdir(os.path.join(entry.path, 'images')):
+            yield entry.path
+
+
+def done_sessions(out_path):
+    if not os.path.exists(out_path):
+        return set()
+    with open(out_path, newline='') as f:
+        return {row['session_id'] for row in csv.DictReader(f)}
+
+
+# === Decode stage (runs in worker processes, no TensorFlow) ===
+def load_session(session_dir):
+    from PIL import Image
+    from utils.preprocessing import preprocess_batch
+    from utils.audio_decoding import decode_audio
+    from utils.audio_processing import spectrograms_from_windows
+    from utils.vad import speech_windows
+    from utils.face_detection import crop_faces
+
+    session = {'session_id': os.path.basename(session_dir), 'frames': None, 'spectrogram': None,
+               'unreadable': 0, 'no_face': 0, 'policy': None, 'error': ''}
+    try:
+        info_path = os.path.join(session_dir, 'session.json')
+        if os.path.exists(info_path):
+            with open(info_path) as f:
+                session['policy'] = json.load(f).get('policy')
+
+        images_dir = os.path.join(session_dir, 'images')
+        imgs = []
+        for name in sorted(os.listdir(images_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                try:
+                    img = Image.open(os.path.join(images_dir, name))
+                    img.load()
+                    imgs.append(img)
+                except Exception:
+                    # Counted like a frame without a face: it could never have passed
+                    session['unreadable'] += 1
+        if imgs and FACE_DETECTION_ENABLED:
+            # Same face gate as the live gateway: frames without a face count as FAKE
+            crops = crop_faces(imgs)
+            imgs = [crop for crop in crops if crop is not None]
+            session['no_face'] = len(crops) - len(imgs)
+        if imgs:
+            session['frames'] = preprocess_batch(imgs)
+
+        for name in AUDIO_FILES:
+            path = os.path.join(session_dir, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    y = decode_audio(f.read(), os.path.splitext(name)[1])
+                if y is not None and len(y):
+                    # Same speech windows as the live gateway; the session score is their mean
+                    windows = speech_windows(y) if AUDIO_VAD_ENABLED else [y]
+                    session['spectrogram'] = spectrograms_from_windows(windows)
+                break
+    except Exception as e:
+        session['error'] = str(e)
+    return session
+
+
+# === Inference stage (main process) ===
+def score_batch(sessions, image_model, audio_model, policy=DECISION_POLICY):
+    """Score several decoded sessions with one image and one audio forward pass.
+
+    ``policy`` applies to sessions that do not name their own in session.json.
+    """
+    from utils.image_processing import predict_batch_with_tta
+    from utils.decision import final_decision
+
+    with_frames = [s for s in sessions if s['frames'] is not None and len(s['frames'])]
+    frame_scores = {}
+    if with_frames:
+        scores = predict_batch_with_tta(np.concatenate([s['frames'] for s in with_frames]), image_model)
+        offset = 0
+        for s in with_frames:
+            frame_scores[s['session_id']] = scores[offset:offset + len(s['frames'])]
+            offset += len(s['frames'])
+
+    with_audio = [s for s in sessions if s['spectrogram'] is not None]
+    audio_scores = {}
+    if with_audio:
+        preds = audio_model.predict(np.concatenate([s['spectrogram'] for s in with_audio]), verbose=0)[:, 0]
+        offset = 0
+        for s in with_audio:
+            audio_scores[s['session_id']] = float(preds[offset:offset + len(s['spectrogram'])].mean())
+            offset += len(s['spectrogram'])
+
+    rows = []
+    for s in sessions:
+        session_policy = DECISION_POLICIES.get(s['policy'], policy)
+        scores = frame_scores.get(s['session_id'], np.zeros(0))
+        real_frames = int(np.sum(scores >= session_policy.image_threshold))
+        face_result = "REAL" if real_frames >= session_policy.min_real_frames else "FAKE"
+        audio_score = audio_scores.get(s['session_id'])
+        audio_result = "REAL" if audio_score is not None and audio_score >= session_policy.audio_threshold else "FAKE"
+        rows.append({
+            'session_id': s['session_id'],
+            'frames': len(scores) + s['unreadable'] + s['no_face'],
+            'unreadable_frames': s['unreadable'],
+            'no_face_frames': s['no_face'],
+            'real_frames': real_frames,
+            'mean_frame_score': f"{scores.mean():.6f}" if len(scores) else "",
+            'face_result': face_result,
+            'audio_score': f"{audio_score:.6f}" if audio_score is not None else "",
+            'audio_result': audio_result,
+            'final_result': final_decision(face_result, audio_result),
+            'error': s['error'],
+        })
+    return rows
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    skip = done_sessions(args.out)
+    pending = [path for path in find_sessions(args.uploads) if os.path.basename(path) not in skip]
+    if args.limit:
+        pending = pending[:args.limit]
+    logging.info(f"📂 {len(pending)} session(s) to score, {len(skip)} already in {args.out}")
+
+    # Workers are spawned before TensorFlow is loaded in this process
+    ctx = multiprocessing.get_context("spawn")
+    pool = ctx.Pool(args.workers)
+
+    from models.loader import ModelRegistry
+    registry = ModelRegistry(args.image_model, args.audio_model).load(warm_up=False)
+    stamp = {'image_model': os.path.basename(args.image_model), 'audio_model': os.path.basename(args.audio_model)}
+
+    new_file = not os.path.exists(args.out) or os.path.getsize(args.out) == 0
+    started = time.perf_counter()
+    scored = 0
+    with open(args.out, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+
+        def flush(batch):
+            nonlocal scored
+            scored_at = datetime.now().isoformat(timespec='seconds')
+            for row in score_batch(batch, registry.image, registry.audio):
+                writer.writerow({**row, **stamp, 'scored_at': scored_at})
+            # Flushed per batch so an interrupted run resumes after the last written batch
+            f.flush()
+            scored += len(batch)
+            rate = scored / (time.perf_counter() - started)
+            logging.info(f"✅ {scored}/{len(pending)} sessions scored ({rate:.1f}/s)")
+
+        batch, batch_frames = [], 0
+        try:
+            for session in pool.imap_unordered(load_session, pending, chunksize=4):
+                batch.append(session)
+                batch_frames += 0 if session['frames'] is None else len(session['frames'])
+                if batch_frames >= args.batch_frames:
+                    flush(batch)
+                    batch, batch_frames = [], 0
+            if batch:
+                flush(batch)
+        finally:
+            pool.terminate()
+
+    if args.parquet:
+        try:
+            import pandas as pd
+            pd.read_csv(args.out).to_parquet(args.parquet, index=False)
+            logging.info(f"✅ Results written to {args.parquet}")
+        except ImportError:
+            logging.error("❌ Parquet output needs pandas and pyarrow installed")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
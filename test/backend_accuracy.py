@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+from PIL import Image
+from tensorflow.keras.models import load_model
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import IMAGE_MODEL_PATH, AUDIO_MODEL_PATH, DECISION_POLICY, AUDIO_SAMPLE_RATE, AUDIO_DURATION
+from models.backends import TFLiteModel, convert_to_tflite, tflite_path, accuracy_delta
+from utils.preprocessing import preprocess_batch, tta_batch
+from utils.spectrogram import spectrogram_batch
+
+# Scores the TFLite variants against the Keras baseline on the inputs the gateway
+# builds: TTA'd preprocess_batch frames and spectrogram_batch windows.
+# Usage: python test/backend_accuracy.py [image_model.h5] [audio_model.h5] [frames_dir]
+image_path = sys.argv[1] if len(sys.argv) > 1 else IMAGE_MODEL_PATH
+audio_path = sys.argv[2] if len(sys.argv) > 2 else AUDIO_MODEL_PATH
+frames_dir = sys.argv[3] if len(sys.argv) > 3 else None
+FRAMES = 15
+CLIPS = 16
+
+rng = np.random.default_rng(0)
+
+
+def load_frames():
+    if frames_dir:
+        names = sorted(os.listdir(frames_dir))[:FRAMES]
+        return [Image.open(os.path.join(frames_dir, n)).convert("RGB") for n in names]
+    # Smooth camera-like frames with a bright patch, as in preprocessing_parity.py
+    frames = (rng.random((FRAMES, 480, 640, 3)) * 255).astype(np.uint8)
+    frames = np.stack([cv2.GaussianBlur(f, (5, 5), 1) for f in frames])
+    frames[:, 120:360, 200:440] = 200
+    return [Image.fromarray(f) for f in frames]
+
+
+def load_clips():
+    # Tones with noise and a speech-like envelope, as in spectrogram_parity.py
+    t = np.arange(AUDIO_SAMPLE_RATE * AUDIO_DURATION) / AUDIO_SAMPLE_RATE
+    clips = [(0.3 * np.sin(2 * np.pi * (200 + 50 * i) * t) + 0.05 * rng.standard_normal(len(t)))
+             * np.abs(np.sin(2 * np.pi * t)) for i in range(CLIPS)]
+    return np.stack(clips).astype(np.float32)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+for name, path, threshold, build_inputs in [
+    ("image", image_path, DECISION_POLICY.image_threshold, lambda: tta_batch(preprocess_batch(load_frames())).copy()),
+    ("audio", audio_path, DECISION_POLICY.audio_threshold, lambda: spectrogram_batch(load_clips()).astype(np.float32)),
+]:
+    keras_model = load_model(path)
+    inputs = build_inputs()
+    keras_model.predict(inputs[:1], verbose=0)
+    reference, keras_ms = timed(keras_model.predict, inputs, verbose=0)
+    print(f"\n=== {name} model: {path} (Keras {keras_ms:.1f} ms / {len(inputs)} inputs) ===")
+
+    for quantization in (None, "float16", "int8"):
+        out_path = convert_to_tflite(keras_model, tflite_path(path, quantization), quantization)
+        candidate = TFLiteModel(out_path, name, batch_sizes=(len(inputs),))
+        candidate.predict(inputs)  # allocates the interpreter; not measured
+
+        scores, tflite_ms = timed(candidate.predict, inputs)
+        report = accuracy_delta(reference, scores, threshold)
+        size_mb = os.path.getsize(out_path) / 1024 / 1024
+        print(f"{quantization or 'float32':>8}: max Δ {report['max_abs_delta']:.5f}, "
+              f"mean Δ {report['mean_abs_delta']:.5f}, "
+              f"label agreement {report['label_agreement'] * 100:.1f}%, "
+              f"{size_mb:.1f} MB, {tflite_ms:.1f} ms")
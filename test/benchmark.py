@@ -0,0 +1,211 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import contextlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Latency / throughput benchmark of the verification pipeline on synthetic data.
+# Drives process_images, process_audio_file and the full POST / through the Flask
+# test client. Uses tiny stand-in models unless real ones are given, and keeps the
+# database, uploads and log in a temp dir.
+# Usage: python test/benchmark.py [--requests 40] [--concurrency 1 4 16]
+#                                 [--json out.json] [--baseline out.json]
+
+FRAMES_PER_REQUEST = 15
+FRAME_SIZE = 320  # the browser crops a 320x320 box
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the verification pipeline")
+    parser.add_argument("--requests", type=int, default=40, help="calls per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--scenarios", nargs="+", default=["process_images", "process_audio_file", "post"])
+    parser.add_argument("--image-model", help="real image model .h5 (default: tiny stand-in)")
+    parser.add_argument("--audio-model", help="real audio model .h5 (default: tiny stand-in)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json output; exit 1 if p95 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs baseline")
+    return parser.parse_args()
+
+
+# === Synthetic inputs ===
+def tiny_model(path, input_size):
+    import tensorflow as tf
+    model = tf.keras.Sequential([
+        tf.keras.Input((input_size[1], input_size[0], 3)),
+        tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(1, activation="sigmoid"),
+    ])
+    model.save(path)
+    return path
+
+
+def synthetic_frames(seed, count=FRAMES_PER_REQUEST):
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        pixels = (rng.random((FRAME_SIZE, FRAME_SIZE, 3)) * 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, "JPEG", quality=95)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def synthetic_wav(seed, sample_rate=16000, seconds=5):
+    import soundfile as sf
+    rng = np.random.default_rng(seed)
+    t = np.arange(sample_rate * seconds) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * rng.uniform(100, 400) * t) + 0.02 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, signal.astype(np.float32), sample_rate, format="WAV")
+    return buffer.getvalue()
+
+
+# === Measurement ===
+def peak_rss_mb():
+    # ru_maxrss is the high-water mark of the whole process, so it is reported once per run
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(name, fn, payloads, concurrency):
+    def call(payload):
+        started = time.perf_counter()
+        fn(payload)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(call, payloads))) * 1000
+    wall = time.perf_counter() - started
+    return {
+        'scenario': name,
+        'concurrency': concurrency,
+        'requests': len(payloads),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'throughput_rps': len(payloads) / wall,
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = {(r['scenario'], r['concurrency']): r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        base = baseline.get((r['scenario'], r['concurrency']))
+        if base and r['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{r['scenario']} @ {r['concurrency']}: p95 {base['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="gateway-bench-")
+
+    image_model = args.image_model or os.path.join(workdir, "image.h5")
+    audio_model = args.audio_model or os.path.join(workdir, "audio.h5")
+
+    # config reads these at import, so nothing from the repo is imported before this point
+    os.environ.update(
+        IMAGE_MODEL_PATH=image_model, AUDIO_MODEL_PATH=audio_model,
+        DATABASE=os.path.join(workdir, "bench.db"), UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        LOG_FILE=os.path.join(workdir, "app.log"), LOG_LEVEL="WARNING", PRELOAD_MODELS="0",
+        # The noise frames contain no face; detection would leave nothing for the image model
+        FACE_DETECTION_ENABLED="0",
+    )
+    from config import IMAGE_INPUT_SIZE, AUDIO_IMAGE_SIZE
+    if not args.image_model:
+        tiny_model(image_model, IMAGE_INPUT_SIZE)
+    if not args.audio_model:
+        tiny_model(audio_model, AUDIO_IMAGE_SIZE)
+
+    from werkzeug.datastructures import FileStorage
+    import app as gateway
+    from utils.inference import get_scheduler
+    from utils.image_processing import process_images
+    from utils.audio_processing import process_audio_file
+
+    started = time.perf_counter()
+    scheduler = get_scheduler()
+    print(f"Models ready in {time.perf_counter() - started:.2f}s "
+          f"({'real' if args.image_model else 'tiny'} image, {'real' if args.audio_model else 'tiny'} audio)")
+
+    folder = os.path.join(workdir, "bench")
+    wav_path = os.path.join(workdir, "clip.wav")
+    with open(wav_path, "wb") as f:
+        f.write(synthetic_wav(0))
+    frames = synthetic_frames(0)
+
+    def run_images(frame_set):
+        return process_images([FileStorage(io.BytesIO(b), f"image{i}.jpg") for i, b in enumerate(frame_set)],
+                              scheduler.image, folder)
+
+    def run_audio(path):
+        return process_audio_file(path, scheduler.audio, folder)
+
+    def run_post(payload):
+        frame_set, wav = payload
+        data = {'images': [(io.BytesIO(b), f"image{i}.jpg") for i, b in enumerate(frame_set)],
+                'audio': (io.BytesIO(wav), "audio.wav")}
+        response = gateway.app.test_client().post("/", data=data, content_type="multipart/form-data")
+        if response.status_code not in (200, 403):
+            raise RuntimeError(f"POST / returned {response.status_code}: {response.get_json()}")
+
+    results = []
+    seed = 1
+    for concurrency in args.concurrency:
+        for scenario in args.scenarios:
+            if scenario == "process_images":
+                fn, payloads = run_images, [frames] * (args.requests + 1)
+            elif scenario == "process_audio_file":
+                fn, payloads = run_audio, [wav_path] * (args.requests + 1)
+            elif scenario == "post":
+                # Every request (warm-up included) needs unseen bytes or the replay check rejects it
+                payloads = [(synthetic_frames(seed + i), synthetic_wav(seed + i)) for i in range(args.requests + 1)]
+                seed += args.requests + 1
+                fn = run_post
+            else:
+                raise SystemExit(f"Unknown scenario: {scenario}")
+
+            warm_up = payloads[-1]
+            payloads = payloads[:args.requests]
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn(warm_up)  # not measured
+                results.append(measure(scenario, fn, payloads, concurrency))
+
+    peak_rss = peak_rss_mb()
+    print(f"\n{'scenario':<20}{'conc':>5}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for r in results:
+        print(f"{r['scenario']:<20}{r['concurrency']:>5}{r['requests']:>5}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['throughput_rps']:>9.1f}")
+    print(f"\nPeak RSS over the whole run: {peak_rss:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'created': time.time(), 'peak_rss_mb': peak_rss, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No p95 regression beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_processing import preprocess_image
+from utils.preprocessing import preprocess_batch, tta_batch
+
+# Compares the batched cv2/NumPy preprocessing with the per-frame PIL chain
+rng = np.random.default_rng(0)
+sizes = [(320, 320), (480, 640), (100, 150)]
+mismatches = 0
+
+for height, width in sizes:
+    frames = (rng.random((15, height, width, 3)) * 255).astype(np.uint8)
+    frames = np.stack([cv2.GaussianBlur(f, (5, 5), 1) for f in frames])
+    frames[:, 10:40, 10:40] = 255
+    pil_imgs = [Image.fromarray(f) for f in frames]
+
+    start = time.perf_counter()
+    legacy = np.stack([np.asarray(preprocess_image(img)) for img in pil_imgs])
+    legacy_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    fast = preprocess_batch(pil_imgs)
+    fast_ms = (time.perf_counter() - start) * 1000
+
+    base = legacy.astype(np.float32) / 255.0
+    expected = np.concatenate([base, np.flip(base, axis=2), np.clip(base * 1.1, 0, 1)])
+
+    diff = int(np.abs(legacy.astype(int) - fast).max())
+    tta_equal = np.array_equal(tta_batch(fast), expected)
+    mismatches += diff != 0 or not tta_equal
+    print(f"{width}x{height} → max pixel diff: {diff}, TTA identical: {tta_equal} "
+          f"(PIL {legacy_ms:.1f} ms, batched {fast_ms:.1f} ms)")
+
+print(f"\n{'OK' if mismatches == 0 else 'MISMATCH'}")
+
+if mismatches:
+    sys.exit(1)
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import soundfile as sf
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")
+
+from config import AUDIO_SAMPLE_RATE, AUDIO_DURATION, AUDIO_IMAGE_SIZE
+import librosa
+from utils.audio_processing import create_spectrogram, create_spectrogram_array
+from utils.spectrogram import mel_spectrogram_db
+
+# Compares the NumPy mel spectrogram with librosa, and the in-memory spectrogram
+# tensor with the legacy librosa + matplotlib PNG round-trip
+temp_dir = tempfile.mkdtemp()
+wav_path = os.path.join(temp_dir, "clip.wav")
+png_path = os.path.join(temp_dir, "clip.png")
+
+worst = 0.0
+worst_db = 0.0
+for seed in range(5):
+    rng = np.random.default_rng(seed)
+    t = np.arange(AUDIO_SAMPLE_RATE * AUDIO_DURATION) / AUDIO_SAMPLE_RATE
+    tone = np.sin(2 * np.pi * (200 + 300 * seed) * t)
+    y = (0.3 * tone + 0.05 * rng.standard_normal(len(t))) * np.abs(np.sin(2 * np.pi * t))
+    sf.write(wav_path, y.astype(np.float32), AUDIO_SAMPLE_RATE)
+
+    create_spectrogram(wav_path, png_path)
+    y32 = y.astype(np.float32)
+    reference_db = librosa.power_to_db(librosa.feature.melspectrogram(y=y32, sr=AUDIO_SAMPLE_RATE, n_mels=128), ref=np.max)
+    db_diff = np.abs(reference_db - mel_spectrogram_db(y32)).max()
+    worst_db = max(worst_db, db_diff)
+
+    legacy = np.array(Image.open(png_path).resize(AUDIO_IMAGE_SIZE).convert("RGB")) / 255.0
+    fast = create_spectrogram_array(wav_path)
+
+    diff = np.abs(legacy - fast).max()
+    worst = max(worst, diff)
+    print(f"seed {seed} → mel dB diff: {db_diff:.2e}, tensor max abs diff: {diff:.6f}")
+
+print(f"\nWorst mel dB diff vs librosa: {worst_db:.2e} ({'OK' if worst_db < 1e-3 else 'MISMATCH'})")
+print(f"Worst tensor diff: {worst:.6f} ({'OK' if worst < 1e-6 else 'MISMATCH'})")
+
+if worst_db >= 1e-3 or worst >= 1e-6:
+    sys.exit(1)
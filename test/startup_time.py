@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Measures how long a fresh worker takes to import the app, serve its first GET
+# and (optionally) have the models ready, with peak RSS after each step.
+# Every run is a separate interpreter so nothing is cached between them. The
+# database, uploads and logs go to a temp dir, which is also the working directory
+# (utils/database.py logs to a relative app.log).
+# Usage: python test/startup_time.py [runs] [--with-models]
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 3
+WITH_MODELS = "--with-models" in sys.argv
+HEAVY_MODULES = ["tensorflow", "keras", "librosa", "matplotlib", "pydub", "av", "cv2", "numpy"]
+
+CHILD = """
+import json, resource, sys, time
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+started = time.perf_counter()
+import app
+result = {'import_s': time.perf_counter() - started, 'import_rss_mb': rss_mb()}
+
+client = app.app.test_client()
+started = time.perf_counter()
+result['get_status'] = client.get('/').status_code
+result['first_get_s'] = time.perf_counter() - started
+result['get_rss_mb'] = rss_mb()
+result['loaded'] = [m for m in %(heavy)r if m in sys.modules]
+
+if %(with_models)r:
+    from utils.inference import get_scheduler
+    started = time.perf_counter()
+    get_scheduler()
+    result['models_ready_s'] = time.perf_counter() - started
+    result['models_rss_mb'] = rss_mb()
+
+print(json.dumps(result))
+"""
+
+
+def run_once():
+    workdir = tempfile.mkdtemp(prefix="gateway-startup-")
+    env = dict(
+        os.environ, PRELOAD_MODELS="0", TF_CPP_MIN_LOG_LEVEL="3", PYTHONPATH=ROOT,
+        DATABASE=os.path.join(workdir, "startup.db"), UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        LOG_FILE=os.path.join(workdir, "app.log"),
+    )
+    code = CHILD % {'heavy': HEAVY_MODULES, 'with_models': WITH_MODELS}
+    proc = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "child failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+results = [run_once() for _ in range(RUNS)]
+
+print(f"=== Worker startup ({RUNS} runs, PRELOAD_MODELS=0) ===")
+for key, label in [
+    ('import_s', "import app"),
+    ('first_get_s', "first GET /"),
+    ('models_ready_s', "models ready"),
+]:
+    if key in results[0]:
+        times = sorted(r[key] for r in results)
+        print(f"{label:<14} median {times[len(times) // 2]:.3f}s  min {times[0]:.3f}s  max {times[-1]:.3f}s")
+
+last = results[-1]
+print(f"Peak RSS: after import {last['import_rss_mb']:.0f} MB, after GET {last['get_rss_mb']:.0f} MB"
+      + (f", with models {last['models_rss_mb']:.0f} MB" if 'models_rss_mb' in last else ""))
+print(f"GET / status: {last['get_status']}")
+print(f"Heavy modules loaded before any POST: {', '.join(last['loaded']) or 'none'}")
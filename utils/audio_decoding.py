@@ -0,0 +1,77 @@
+import io
+import shutil
+import logging
+import subprocess
+import importlib.util
+import numpy as np
+from config import AUDIO_SAMPLE_RATE
+from utils.metrics import stage_timer
+
+# PyAV is optional and only imported on first decode
+HAVE_PYAV = importlib.util.find_spec('av') is not None
+
+# Containers libsndfile can read without an external decoder
+SOUNDFILE_EXTENSIONS = {'.wav', '.flac'}
+
+
+# === 1. WAV / FLAC via libsndfile ===
+def _decode_with_soundfile(data):
+    import soundfile as sf
+    y, sr = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    y = y.mean(axis=1)
+    if sr != AUDIO_SAMPLE_RATE:
+        import librosa
+        y = librosa.resample(y, orig_sr=sr, target_sr=AUDIO_SAMPLE_RATE)
+    return y.astype(np.float32)
+
+
+# === 2. WebM / Ogg via PyAV (in-process libav binding) ===
+def _decode_with_pyav(data):
+    import av
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=AUDIO_SAMPLE_RATE)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+    for out in resampler.resample(None):
+        chunks.append(out.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    # Same int16 quantization the ffmpeg -> audio.wav -> librosa path applied
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+
+# === 3. Fallback: ffmpeg over pipes (no temp files) ===
+def _decode_with_ffmpeg(data):
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found on PATH and PyAV is not installed")
+    command = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-i', 'pipe:0',
+        '-f', 's16le', '-ac', '1', '-ar', str(AUDIO_SAMPLE_RATE), 'pipe:1'
+    ]
+    with stage_timer("ffmpeg"):
+        proc = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode(errors='ignore').strip() or "ffmpeg failed")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+# === Public entry point ===
+def decode_audio(data, ext=None):
+    """Decode uploaded audio bytes to a 16 kHz mono float32 signal, or None on failure."""
+    ext = (ext or '').lower()
+    decoders = []
+    if ext in SOUNDFILE_EXTENSIONS:
+        decoders.append(_decode_with_soundfile)
+    if HAVE_PYAV:
+        decoders.append(_decode_with_pyav)
+    decoders.append(_decode_with_ffmpeg)
+
+    for decoder in decoders:
+        try:
+            with stage_timer("decode_audio"):
+                return decoder(data)
+        except Exception as e:
+            logging.warning(f"⚠️ Audio decoder {decoder.__name__} failed: {e}")
+    return None
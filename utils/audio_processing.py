@@ -1,12 +1,13 @@
 import os
 import io
 import hashlib
-import librosa
 import numpy as np
-import matplotlib.pyplot as plt
-from pydub import AudioSegment
 from PIL import Image
-from config import AUDIO_SAMPLE_RATE, AUDIO_DURATION, AUDIO_IMAGE_SIZE
+from config import AUDIO_SAMPLE_RATE, AUDIO_DURATION, AUDIO_IMAGE_SIZE, DECISION_POLICY, AUDIO_VAD_ENABLED
+from utils.spectrogram import spectrogram_tensor, mel_spectrogram_db, spectrogram_batch
+from utils.vad import speech_windows
+from utils.audio_decoding import decode_audio
+from utils.metrics import stage_timer
 
 # === 1. Calculate SHA-256 Hash ===
 def calculate_file_hash(file_path):
@@ -25,7 +26,8 @@ def convert_webm_to_wav(webm_path, wav_path):
             'ffmpeg', '-y', '-i', webm_path,
             '-ar', '16000', '-ac', '1', wav_path
         ]
-        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with stage_timer("ffmpeg"):
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         return os.path.exists(wav_path)
     except Exception as e:
         print(f"[FFmpeg Conversion Error] {e}")
@@ -35,24 +37,53 @@ def convert_webm_to_wav(webm_path, wav_path):
 # === 3. Create mel spectrogram ===
 def create_spectrogram(wav_path, image_path):
     try:
+        import librosa
+        import librosa.display
+        import matplotlib.pyplot as plt
         y, sr = librosa.load(wav_path, sr=AUDIO_SAMPLE_RATE, duration=AUDIO_DURATION)
         if len(y) == 0:
             raise ValueError("Empty audio signal")
 
-        S = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
-        S_DB = librosa.power_to_db(S, ref=np.max)
+        with stage_timer("spectrogram"):
+            S = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
+            S_DB = librosa.power_to_db(S, ref=np.max)
 
-        plt.figure(figsize=(3, 3))
-        librosa.display.specshow(S_DB, sr=sr)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig(image_path, bbox_inches='tight', pad_inches=0)
-        plt.close()
+            plt.figure(figsize=(3, 3))
+            librosa.display.specshow(S_DB, sr=sr)
+            plt.axis('off')
+            plt.tight_layout()
+            plt.savefig(image_path, bbox_inches='tight', pad_inches=0)
+            plt.close()
         return True
     except Exception as e:
         print(f"[Spectrogram Error] {e}")
         return False
 
+# === 3b. Mel spectrogram straight to model input (no figure, no PNG) ===
+def spectrogram_from_signal(y, sr=AUDIO_SAMPLE_RATE):
+    try:
+        y = y[:int(AUDIO_DURATION * sr)]
+        if len(y) == 0:
+            raise ValueError("Empty audio signal")
+
+        # Cached window + mel basis; same values as librosa melspectrogram + power_to_db
+        with stage_timer("spectrogram"):
+            return spectrogram_tensor(mel_spectrogram_db(y, sr))
+    except Exception as e:
+        print(f"[Spectrogram Error] {e}")
+        return None
+
+def create_spectrogram_array(wav_path):
+    try:
+        with open(wav_path, 'rb') as f:
+            y = decode_audio(f.read(), os.path.splitext(wav_path)[1])
+        if y is None:
+            raise ValueError(f"Could not decode {wav_path}")
+    except Exception as e:
+        print(f"[Spectrogram Error] {e}")
+        return None
+    return spectrogram_from_signal(y)
+
 # === 4. Load image and predict ===
 def predict_audio(model, spectrogram_path):
     try:
@@ -60,63 +91,70 @@ def predict_audio(model, spectrogram_path):
         img_array = np.array(img) / 255.0
         img_array = img_array.reshape((1, *AUDIO_IMAGE_SIZE, 3))
         prob = model.predict(img_array, verbose=0)[0][0]
-        label = "REAL" if prob >= 0.8 else "FAKE"
+        label = "REAL" if prob >= DECISION_POLICY.audio_threshold else "FAKE"
         return label, prob
     except Exception as e:
         print(f"[Prediction Error] {e}")
         return "FAKE", 0.0
 
-# === 5. For Flask Uploads ===
-def process_audio(audio_file, model, folder_path):
+def spectrograms_from_windows(windows, sr=AUDIO_SAMPLE_RATE):
+    """(n, 224, 224, 3) inputs for the selected windows; equal-length windows share one STFT."""
     try:
-        os.makedirs(folder_path, exist_ok=True)
-        ext = os.path.splitext(audio_file.filename)[1].lower()
-        ext = ext if ext in ['.webm', '.ogg'] else '.webm'
-
-        audio_path = os.path.join(folder_path, f'audio{ext}')
-        wav_path = os.path.join(folder_path, "audio.wav")
-        spec_path = os.path.join(folder_path, "audio_spec.png")
-
-        audio_file.stream.seek(0)
-        with open(audio_path, 'wb') as f:
-            f.write(audio_file.read())
-
-        if os.path.getsize(audio_path) < 1000:
-            print("[Error] Uploaded audio file too small or empty.")
-            return "FAKE"
-
-        print("📦 Audio file hash:", calculate_file_hash(audio_path))
-
-        if not convert_webm_to_wav(audio_path, wav_path):
-            return "FAKE"
-        if not create_spectrogram(wav_path, spec_path):
-            return "FAKE"
-
-        label, confidence = predict_audio(model, spec_path)
-        print(f"🧠 Audio prediction: {label} (confidence: {confidence:.4f})")
-        return label
+        if len(windows) > 1 and len({len(w) for w in windows}) == 1:
+            with stage_timer("spectrogram"):
+                return spectrogram_batch(np.stack(windows), sr)
+        spec = spectrogram_from_signal(windows[0], sr)
+        return None if spec is None else spec[None]
+    except Exception as e:
+        print(f"[Spectrogram Error] {e}")
+        return None
 
+def predict_audio_windows(model, specs, policy=DECISION_POLICY):
+    """Mean score over all windows from one batched model call."""
+    try:
+        probs = model.predict(specs, verbose=0)[:, 0]
+        prob = float(np.mean(probs))
+        label = "REAL" if prob >= policy.audio_threshold else "FAKE"
+        return label, prob
     except Exception as e:
-        print(f"[Audio Processing Error] {e}")
+        print(f"[Prediction Error] {e}")
+        return "FAKE", 0.0
+
+def audio_inputs(y, use_vad=AUDIO_VAD_ENABLED):
+    """Model inputs for a decoded clip: its speech windows as an (n, 224, 224, 3) stack, or None."""
+    if y is None or len(y) == 0:
+        return None
+    if use_vad:
+        with stage_timer("vad"):
+            windows = speech_windows(y)
+    else:
+        windows = [y[:int(AUDIO_DURATION * AUDIO_SAMPLE_RATE)]]
+    return spectrograms_from_windows(windows)
+
+# === 5. Shared: decoded bytes -> label ===
+def predict_audio_bytes(data, ext, model, should_score=None, use_vad=AUDIO_VAD_ENABLED, policy=DECISION_POLICY):
+    specs = audio_inputs(decode_audio(data, ext), use_vad)
+    if specs is None:
         return "FAKE"
+    if should_score is not None and not should_score():
+        print("⏭️ Audio model skipped: face verdict already FAKE")
+        return "SKIPPED"
+
+    label, confidence = predict_audio_windows(model, specs, policy)
+    print(f"🧠 Audio prediction: {label} (confidence: {confidence:.4f}, windows: {len(specs)})")
+    return label
 
 # === 6. For Manual Testing (path-based) ===
-def process_audio_file(audio_path, model, folder_path):
+# Flask uploads go through utils.pipeline.VerificationPipeline
+def process_audio_file(audio_path, model, folder_path, should_score=None):
     try:
         os.makedirs(folder_path, exist_ok=True)
-        wav_path = os.path.join(folder_path, "audio.wav")
-        spec_path = os.path.join(folder_path, "audio_spec.png")
-
-        print("📦 Audio file hash:", calculate_file_hash(audio_path))
-
-        if not convert_webm_to_wav(audio_path, wav_path):
-            return "FAKE"
-        if not create_spectrogram(wav_path, spec_path):
-            return "FAKE"
+        with open(audio_path, 'rb') as f:
+            data = f.read()
 
-        label, confidence = predict_audio(model, spec_path)
-        print(f"🧠 Audio prediction: {label} (confidence: {confidence:.4f})")
-        return label
+        print("📦 Audio file hash:", hashlib.sha256(data).hexdigest())
+        ext = os.path.splitext(audio_path)[1]
+        return predict_audio_bytes(data, ext, model, should_score)
 
     except Exception as e:
         print(f"[Audio File Error] {e}")
@@ -0,0 +1,119 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+from config import (
+    AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_FLUSH_RETRIES, AUDIT_RETRY_DELAY
+)
+from utils.database import verification_event, log_verifications
+from utils.metrics import VERDICTS, stage_timer
+
+
+class AuditWriter:
+    """Bounded queue of audit events flushed to SQLite in batches by a background thread.
+
+    Requests only enqueue; when the queue is full the event is dropped and counted
+    rather than blocking the verdict.
+    """
+
+    def __init__(self, max_queue=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # === Producer side ===
+    def submit(self, event):
+        VERDICTS.inc(status=event.get('status'))
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            logging.error(f"❌ Audit queue full, dropped event for session: {event.get('session_id')}")
+            return False
+
+    def log_verification(self, *args, **kwargs):
+        return self.submit(verification_event(*args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+            }
+
+    # === Writer side ===
+    def _take_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        """Write ``batch`` in one transaction, retrying a transient failure (e.g. a long lock).
+
+        If the batch still fails, its events are written one by one so a single bad
+        event only loses itself.
+        """
+        with stage_timer("db_write"):
+            for attempt in range(AUDIT_FLUSH_RETRIES + 1):
+                if attempt:
+                    time.sleep(AUDIT_RETRY_DELAY * 2 ** (attempt - 1))
+                if log_verifications(batch):
+                    written, failed = len(batch), 0
+                    break
+            else:
+                logging.warning(f"⚠️ Audit batch of {len(batch)} failed {AUDIT_FLUSH_RETRIES + 1} times, writing events one by one")
+                written = sum(1 for event in batch if log_verifications([event]))
+                failed = len(batch) - written
+        with self._lock:
+            self.written += written
+            self.failed += failed
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+        # Shutdown: write whatever is still queued
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._flush(batch)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        logging.info(f"✅ Audit writer drained: {self.stats()}")
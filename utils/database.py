@@ -1,7 +1,8 @@
 import sqlite3
 import logging
+import threading
 from datetime import datetime
-from config import DATABASE
+from config import DATABASE, DB_BUSY_TIMEOUT
 
 # === Configure Logging ===
 logging.basicConfig(
@@ -10,20 +11,55 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-# === Create DB connection ===
+# === Per-thread pooled connection ===
+_local = threading.local()
+
+def _connect():
+    conn = sqlite3.connect(DATABASE, timeout=DB_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run alongside the writer; NORMAL only fsyncs at checkpoints
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 def get_db_connection():
-    try:
-        conn = sqlite3.connect(DATABASE)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e:
-        logging.error(f"Database connection error: {str(e)}")
-        raise
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'path', None) != DATABASE:
+        try:
+            conn = _connect()
+        except sqlite3.Error as e:
+            logging.error(f"Database connection error: {str(e)}")
+            raise
+        _local.conn = conn
+        _local.path = DATABASE
+    return conn
+
+# === Schema migrations (tracked in PRAGMA user_version) ===
+MIGRATIONS = [
+    # 1: indexes for history, forensic and keyset-pagination queries
+    [
+        'CREATE INDEX IF NOT EXISTS idx_access_log_time ON access_log (timestamp, id)',
+        'CREATE INDEX IF NOT EXISTS idx_access_log_session ON access_log (session_id)',
+        'CREATE INDEX IF NOT EXISTS idx_access_log_ip_time ON access_log (ip_address, timestamp, id)',
+        'CREATE INDEX IF NOT EXISTS idx_access_log_status_time ON access_log (status, timestamp, id)',
+        'CREATE INDEX IF NOT EXISTS idx_file_hashes_session ON file_hashes (session_id)',
+    ],
+]
+
+def _migrate(conn):
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {target}')
+        logging.info(f"✅ Database migrated to schema version {target}")
 
 # === Initialize DB and create tables ===
 def init_db():
+    conn = None
     try:
-        conn = sqlite3.connect(DATABASE)
+        conn = _connect()
         cursor = conn.cursor()
 
         # access_log table with image_hash included
@@ -68,85 +104,199 @@ def init_db():
         ''')
 
         conn.commit()
+        _migrate(conn)
         logging.info("✅ Database initialized successfully")
     except Exception as e:
         logging.error(f"❌ Database initialization error: {str(e)}")
         raise
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
+
+_ACCESS_INSERT = '''
+    INSERT INTO access_log
+    (timestamp, session_id, ip_address, face_result, audio_result, image_hash, audio_hash, status, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_HASH_COLUMNS = '''
+    INTO file_hashes
+    (file_hash, file_type, timestamp, session_id, status)
+    VALUES (?, ?, ?, ?, ?)
+'''
+_HASH_INSERT = 'INSERT' + _HASH_COLUMNS
+# Batched path: a replayed file must not roll back the whole verification
+_HASH_INSERT_OR_IGNORE = 'INSERT OR IGNORE' + _HASH_COLUMNS
 
 # === Log full access entry ===
 def log_access(session_id, ip_address, face_result, audio_result, image_hash, audio_hash, status, error_message=None):
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO access_log 
-            (timestamp, session_id, ip_address, face_result, audio_result, image_hash, audio_hash, status, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now(),
-            session_id,
-            ip_address,
-            face_result,
-            audio_result,
-            image_hash,
-            audio_hash,
-            status,
-            error_message
-        ))
-
-        conn.commit()
+        with get_db_connection() as conn:
+            conn.execute(_ACCESS_INSERT, (
+                datetime.now(),
+                session_id,
+                ip_address,
+                face_result,
+                audio_result,
+                image_hash,
+                audio_hash,
+                status,
+                error_message
+            ))
         logging.info(f"✅ Access log inserted for session: {session_id}")
     except Exception as e:
         logging.error(f"❌ Error logging access: {str(e)}")
-    finally:
-        conn.close()
 
 # === Log hash per file ===
 def log_file_hash(file_hash, file_type, session_id, status):
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO file_hashes 
-            (file_hash, file_type, timestamp, session_id, status)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            file_hash,
-            file_type,
-            datetime.now(),
-            session_id,
-            status
-        ))
-
-        conn.commit()
+        with get_db_connection() as conn:
+            conn.execute(_HASH_INSERT, (
+                file_hash,
+                file_type,
+                datetime.now(),
+                session_id,
+                status
+            ))
         logging.info(f"✅ File hash logged: {file_hash}")
     except sqlite3.IntegrityError:
         logging.warning(f"⚠️ Duplicate file hash: {file_hash}")
     except Exception as e:
         logging.error(f"❌ Error logging file hash: {str(e)}")
-    finally:
-        conn.close()
 
-# === Get recent access logs ===
-def get_access_history(limit=100):
+# === Access row + every file hash of one verification in a single transaction ===
+def _insert_verification(conn, event):
+    conn.execute(_ACCESS_INSERT, (
+        event['timestamp'], event['session_id'], event['ip_address'],
+        event['face_result'], event['audio_result'],
+        event['image_hash'], event['audio_hash'],
+        event['status'], event.get('error_message')
+    ))
+    rows = [(h, file_type, event['timestamp'], event['session_id'], file_status)
+            for h, file_type, file_status in event.get('file_hashes', ()) if h]
+    cursor = conn.executemany(_HASH_INSERT_OR_IGNORE, rows)
+    return len(rows), len(rows) - max(cursor.rowcount, 0)
+
+def verification_event(session_id, ip_address, face_result, audio_result, image_hash, audio_hash,
+                       status, file_hashes=(), error_message=None, timestamp=None):
+    """``file_hashes`` is a list of (file_hash, file_type, status) tuples for this session."""
+    return {
+        'timestamp': timestamp or datetime.now(),
+        'session_id': session_id,
+        'ip_address': ip_address,
+        'face_result': face_result,
+        'audio_result': audio_result,
+        'image_hash': image_hash,
+        'audio_hash': audio_hash,
+        'status': status,
+        'error_message': error_message,
+        'file_hashes': list(file_hashes),
+    }
+
+def log_verification(*args, **kwargs):
+    log_verifications([verification_event(*args, **kwargs)])
+
+# === Many verifications in one transaction (audit writer flushes) ===
+def log_verifications(events):
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM access_log 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
-        return cursor.fetchall()
+        hashes = duplicates = 0
+        with get_db_connection() as conn:
+            for event in events:
+                written, dup = _insert_verification(conn, event)
+                hashes += written
+                duplicates += dup
+        if duplicates:
+            logging.warning(f"⚠️ {duplicates} duplicate file hash(es) across {len(events)} verification(s)")
+        logging.info(f"✅ {len(events)} verification(s) logged ({hashes} file hashes)")
+        return True
+    except Exception as e:
+        logging.error(f"❌ Error logging verification: {str(e)}")
+        return False
+
+# === Keyset-paginated access log queries ===
+def _access_filters(start=None, end=None, ip_address=None, session_id=None, status=None, before=None):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append('timestamp >= ?')
+        params.append(start)
+    if end is not None:
+        clauses.append('timestamp < ?')
+        params.append(end)
+    if ip_address is not None:
+        clauses.append('ip_address = ?')
+        params.append(ip_address)
+    if session_id is not None:
+        clauses.append('session_id = ?')
+        params.append(session_id)
+    if status is not None:
+        clauses.append('status = ?')
+        params.append(status)
+    if before is not None:
+        # Keyset cursor: rows strictly older than the last one already returned
+        clauses.append('(timestamp, id) < (?, ?)')
+        params.extend(before)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params
+
+def get_access_page(limit=100, before=None, **filters):
+    """One page of access_log rows, newest first.
+
+    Returns ``(rows, next_cursor)``; pass ``next_cursor`` back as ``before`` for
+    the following page. ``next_cursor`` is None on the last page. Filters:
+    ``start``/``end`` (timestamp range), ``ip_address``, ``session_id``, ``status``.
+    """
+    try:
+        where, params = _access_filters(before=before, **filters)
+        cursor = get_db_connection().execute(
+            f'SELECT * FROM access_log {where} ORDER BY timestamp DESC, id DESC LIMIT ?',
+            (*params, limit)
+        )
+        rows = cursor.fetchall()
+        next_cursor = (rows[-1]['timestamp'], rows[-1]['id']) if len(rows) == limit else None
+        return rows, next_cursor
     except Exception as e:
-        logging.error(f"❌ Error retrieving access history: {str(e)}")
+        logging.error(f"❌ Error retrieving access page: {str(e)}")
+        return [], None
+
+def iter_access_log(page_size=500, **filters):
+    """Stream every matching access_log row, newest first, one page in memory at a time."""
+    before = None
+    while True:
+        rows, before = get_access_page(limit=page_size, before=before, **filters)
+        yield from rows
+        if before is None:
+            break
+
+# === File hash lookups (replay detection) ===
+def get_file_hashes(file_hashes):
+    """Rows of ``file_hashes`` for every hash in the list that is known, in one query."""
+    if not file_hashes:
         return []
-    finally:
-        conn.close()
+    try:
+        placeholders = ','.join('?' * len(file_hashes))
+        return get_db_connection().execute(
+            f'SELECT file_hash, file_type, session_id, status FROM file_hashes WHERE file_hash IN ({placeholders})',
+            list(file_hashes)
+        ).fetchall()
+    except Exception as e:
+        logging.error(f"❌ Error looking up file hashes: {str(e)}")
+        return []
+
+def iter_file_hashes(batch_size=5000):
+    """Stream (file_hash, session_id, status) rows, oldest first."""
+    cursor = get_db_connection().execute(
+        'SELECT file_hash, session_id, status FROM file_hashes ORDER BY id'
+    )
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+# === Get recent access logs ===
+def get_access_history(limit=100):
+    rows, _ = get_access_page(limit=limit)
+    return rows
 
 # === Legacy or Custom Log Table Entry ===
 def insert_log(ip, image_result, audio_result, folder_hash):
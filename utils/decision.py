@@ -0,0 +1,44 @@
+import threading
+from config import DECISION_POLICY
+
+
+class FrameVote:
+    """Running "min_real_frames of N" vote that knows as soon as its outcome is fixed.
+
+    Shared between the image and audio branches of one request so the audio
+    branch can skip the model once the face verdict is already FAKE.
+    """
+
+    def __init__(self, total_frames, policy=DECISION_POLICY):
+        self.policy = policy
+        self.total = total_frames
+        self.seen = 0
+        self.real = 0
+        self._lock = threading.Lock()
+
+    def add(self, label, weight=1):
+        """Count ``label`` for ``weight`` frames (a deduplicated group votes once per member)."""
+        with self._lock:
+            self.seen += weight
+            if label == "REAL":
+                self.real += weight
+
+    @property
+    def verdict(self):
+        """REAL/FAKE once the remaining frames can no longer change it, else None."""
+        with self._lock:
+            if self.real >= self.policy.min_real_frames:
+                return "REAL"
+            if self.real + (self.total - self.seen) < self.policy.min_real_frames:
+                return "FAKE"
+            return None
+
+    def final(self):
+        return self.verdict or "FAKE"
+
+    def should_score_audio(self):
+        return not (self.policy.skip_audio_on_face_fail and self.verdict == "FAKE")
+
+
+def final_decision(face_result, audio_result):
+    return "REAL" if face_result == "REAL" and audio_result == "REAL" else "FAKE"
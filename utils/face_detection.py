@@ -0,0 +1,71 @@
+import os
+import logging
+import threading
+import numpy as np
+import cv2
+from config import (
+    FACE_CASCADE_PATH, FACE_DETECT_WIDTH, FACE_MIN_SIZE_RATIO, FACE_CROP_MARGIN
+)
+
+_local = threading.local()
+_unavailable = threading.Event()
+
+
+def cascade_path():
+    return FACE_CASCADE_PATH or os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+
+
+def get_detector():
+    """Haar cascade loaded once per thread (a CascadeClassifier must not be shared across threads).
+
+    Returns None when the cascade file cannot be loaded; detection is then skipped.
+    """
+    if _unavailable.is_set():
+        return None
+    detector = getattr(_local, 'detector', None)
+    if detector is None:
+        try:
+            detector = cv2.CascadeClassifier(cascade_path())
+            if detector.empty():
+                raise FileNotFoundError(cascade_path())
+        except Exception as e:
+            _unavailable.set()
+            logging.error(f"❌ Face detector unavailable ({e}); frames are scored without face detection")
+            return None
+        _local.detector = detector
+    return detector
+
+
+def detect_face(pil_img, detector):
+    """Largest face as a (left, top, right, bottom) crop box with margin, or None."""
+    gray = np.asarray(pil_img.convert("L"))
+    height, width = gray.shape
+    # Detection runs on a small copy; boxes are scaled back to the original frame
+    scale = min(1.0, FACE_DETECT_WIDTH / width)
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    min_side = max(1, int(min(small.shape) * FACE_MIN_SIZE_RATIO))
+    faces = detector.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+    if len(faces) == 0:
+        return None
+
+    x, y, w, h = (v / scale for v in max(faces, key=lambda f: f[2] * f[3]))
+    cx, cy = x + w / 2, y + h / 2
+    half = max(w, h) * (1 + 2 * FACE_CROP_MARGIN) / 2
+    return (max(0, int(cx - half)), max(0, int(cy - half)),
+            min(width, int(cx + half)), min(height, int(cy + half)))
+
+
+def crop_faces(pil_imgs):
+    """Face crops of ``pil_imgs`` with None where no face was found.
+
+    Without a usable detector the frames are returned unchanged.
+    """
+    detector = get_detector()
+    if detector is None:
+        return list(pil_imgs)
+    crops = []
+    for img in pil_imgs:
+        box = detect_face(img, detector)
+        crops.append(None if box is None else img.crop(box))
+    return crops
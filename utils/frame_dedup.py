@@ -0,0 +1,33 @@
+import numpy as np
+import cv2
+from config import FRAME_DEDUP_MAX_DISTANCE
+
+DHASH_SIZE = 8  # 8x8 = 64-bit difference hash
+
+
+def dhash(frame):
+    """64 booleans: is each pixel of a 9x8 grey thumbnail brighter than its right neighbour."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (DHASH_SIZE + 1, DHASH_SIZE), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).reshape(-1)
+
+
+def group_frames(frames, max_distance=FRAME_DEDUP_MAX_DISTANCE):
+    """Group near-identical frames of an (N, H, W, 3) uint8 stack.
+
+    Returns a list of groups, each a list of positions into ``frames`` whose
+    first entry is the representative that gets scored. A frame joins the first
+    group whose representative is within ``max_distance`` differing hash bits.
+    """
+    groups = []
+    rep_hashes = []
+    for pos, frame in enumerate(frames):
+        h = dhash(frame)
+        for group, rep in zip(groups, rep_hashes):
+            if np.count_nonzero(h != rep) <= max_distance:
+                group.append(pos)
+                break
+        else:
+            groups.append([pos])
+            rep_hashes.append(h)
+    return groups
@@ -2,8 +2,12 @@ import os
 import numpy as np
 import cv2
 from PIL import Image, ImageFilter
-from tensorflow.keras.preprocessing import image
-from config import IMAGE_INPUT_SIZE
+from config import IMAGE_INPUT_SIZE, DECISION_POLICY, FACE_DETECTION_ENABLED, FRAME_DEDUP_ENABLED
+from utils.decision import FrameVote
+from utils.preprocessing import preprocess_batch, tta_batch
+from utils.metrics import stage_timer
+from utils.face_detection import crop_faces
+from utils.frame_dedup import group_frames
 
 def equalize_histogram(pil_img):
     img = np.array(pil_img)
@@ -20,6 +24,7 @@ def preprocess_image(pil_img):
     return pil_img
 
 def predict_with_tta(pil_img, model):
+    from tensorflow.keras.preprocessing import image
     base = image.img_to_array(pil_img) / 255.0
     base = np.expand_dims(base, axis=0)
 
@@ -33,20 +38,112 @@ def predict_with_tta(pil_img, model):
     ]
     return np.mean(preds)
 
-def process_images(images, model, folder_path):
-    results = []
+def predict_batch_with_tta(frames, model):
+    """Score an (N, 224, 224, 3) uint8 frame stack with one forward pass over base, flipped and bright copies."""
+    if len(frames) == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Layout is [base..., flipped..., bright...] so row i of the reshape is augmentation i
+    batch = tta_batch(frames)
+    preds = model.predict(batch, batch_size=len(batch), verbose=0)[:, 0]
+    return preds.reshape(3, len(frames)).mean(axis=0)
+
+def process_frames(pil_imgs, model, folder_path, vote=None, policy=DECISION_POLICY,
+                   detect_faces=FACE_DETECTION_ENABLED, dedup=FRAME_DEDUP_ENABLED):
+    """Label each decoded frame REAL/FAKE, stopping early once the frame vote is decided.
+
+    ``None`` entries (frames that failed to decode) count as FAKE. Frames with no
+    detected face are labelled NO_FACE and also count as FAKE. Near-identical
+    frames share the label of the one that was scored. Frames left unscored
+    because the verdict was already fixed are labelled SKIPPED.
+    """
     os.makedirs(folder_path, exist_ok=True)
+    if vote is None:
+        vote = FrameVote(len(pil_imgs), policy)
+    prepared = prepare_frames(pil_imgs, vote, detect_faces, dedup)
+    return score_prepared_frames(prepared, model, vote, policy)
+
+def prepare_frames(pil_imgs, vote, detect_faces=FACE_DETECTION_ENABLED, dedup=FRAME_DEDUP_ENABLED):
+    """Face crop, preprocess and group decoded frames ahead of scoring.
 
-    for i, img_file in enumerate(images):
+    Returns ``(results, indices, frames, groups)``: provisional labels, the position
+    in ``pil_imgs`` of each row of ``frames`` and the near-duplicate groups of those
+    rows. Frames rejected here are already counted in ``vote``.
+    """
+    results = ["FAKE"] * len(pil_imgs)
+    indices = []
+    for i, pil_img in enumerate(pil_imgs):
         try:
-            pil_img = Image.open(img_file.stream)
-            pil_img = preprocess_image(pil_img)
-            prediction = predict_with_tta(pil_img, model)
-            label = "REAL" if prediction >= 0.5 else "FAKE"
-            results.append(label)
+            if pil_img is None:
+                raise ValueError("Frame could not be decoded")
+            pil_img.load()
+            indices.append(i)
         except Exception:
-            results.append("FAKE")
+            vote.add("FAKE")
+
+    inputs = [pil_imgs[i] for i in indices]
+    if detect_faces and inputs:
+        with stage_timer("face_detect"):
+            crops = crop_faces(inputs)
+        kept = []
+        for i, crop in zip(indices, crops):
+            if crop is None:
+                results[i] = "NO_FACE"
+                vote.add("FAKE")
+            else:
+                kept.append((i, crop))
+        indices = [i for i, _ in kept]
+        inputs = [crop for _, crop in kept]
+    try:
+        with stage_timer("preprocess"):
+            frames = preprocess_batch(inputs)
+    except Exception:
+        for _ in indices:
+            vote.add("FAKE")
+        return results, [], None, []
+
+    # Only one representative per group of near-identical frames is scored
+    if dedup and len(frames) > 1:
+        with stage_timer("dedup"):
+            groups = group_frames(frames)
+    else:
+        groups = [[pos] for pos in range(len(frames))]
+    return results, indices, frames, groups
+
+def score_prepared_frames(prepared, model, vote, policy=DECISION_POLICY):
+    """Score the output of ``prepare_frames`` chunk by chunk; returns the per-frame labels."""
+    results, indices, frames, groups = prepared
+    reps = [group[0] for group in groups]
+
+    chunk = max(1, policy.frame_chunk_size)
+    for start in range(0, len(reps), chunk):
+        if vote.verdict is not None:
+            for group in groups[start:]:
+                for pos in group:
+                    results[indices[pos]] = "SKIPPED"
+            break
+
+        chunk_groups = groups[start:start + chunk]
+        try:
+            predictions = predict_batch_with_tta(frames[reps[start:start + chunk]], model)
+        except Exception:
+            predictions = np.zeros(len(chunk_groups))
+
+        for group, prediction in zip(chunk_groups, predictions):
+            label = "REAL" if prediction >= policy.image_threshold else "FAKE"
+            for pos in group:
+                results[indices[pos]] = label
+            vote.add(label, weight=len(group))
     return results
+
+def process_images(images, model, folder_path, vote=None, policy=DECISION_POLICY):
+    pil_imgs = []
+    for img_file in images:
+        try:
+            pil_imgs.append(Image.open(img_file.stream))
+        except Exception:
+            pil_imgs.append(None)
+    return process_frames(pil_imgs, model, folder_path, vote, policy)
 import hashlib
 
 def calculate_file_hash(file_path):
@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import logging
+import threading
+import numpy as np
+from concurrent.futures import Future
+from config import INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS
+from utils.metrics import BATCH_ROWS, stage_timer
+
+
+class BatchingPredictor:
+    """Owns one model on a worker thread and batches rows from concurrent callers.
+
+    Exposes a Keras-style ``predict`` so it can be passed anywhere a model is.
+    """
+
+    def __init__(self, model, name, max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+                 max_wait_ms=INFERENCE_MAX_WAIT_MS):
+        self.model = model
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._pending = None
+        self._thread = threading.Thread(target=self._run, name=f"infer-{name}", daemon=True)
+        self._thread.start()
+
+    # === Client side ===
+    def submit(self, batch):
+        """Queue an (n, ...) input batch; the future resolves to an (n, 1) prediction array."""
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError(f"{self.name} predictor is closed"))
+            return future
+        self._queue.put((np.asarray(batch, dtype=np.float32), future))
+        return future
+
+    def predict(self, batch, **kwargs):
+        return self.submit(batch).result()
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # === Worker side ===
+    def _collect(self, first):
+        items = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            if rows + len(item[0]) > self.max_batch_size:
+                self._pending = item
+                break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            first = self._pending or self._queue.get()
+            self._pending = None
+            if first is None:
+                break
+
+            items = self._collect(first)
+            try:
+                batch = np.concatenate([inputs for inputs, _ in items], axis=0)
+                BATCH_ROWS.observe(len(batch), model=self.name)
+                with stage_timer(f"inference_{self.name}"):
+                    preds = self.model.predict(batch, batch_size=len(batch), verbose=0)
+            except Exception as e:
+                logging.error(f"❌ {self.name} batch inference failed: {e}")
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for inputs, future in items:
+                future.set_result(preds[offset:offset + len(inputs)])
+                offset += len(inputs)
+            logging.debug(f"{self.name}: served {len(items)} requests in one batch of {len(batch)}")
+
+        # Fail anything that arrived after shutdown was requested
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError(f"{self.name} predictor is closed"))
+
+
+class InferenceScheduler:
+    """Background batching for both gateway models."""
+
+    def __init__(self, image_model, audio_model):
+        self.image = BatchingPredictor(image_model, "image")
+        self.audio = BatchingPredictor(audio_model, "audio")
+
+    def close(self):
+        self.image.close()
+        self.audio.close()
+
+
+class ModelsUnavailable(RuntimeError):
+    """Raised by ``get_scheduler`` once the models have failed to load; the load is not retried."""
+
+
+# === Process-wide scheduler, built on first use ===
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_load_failed = threading.Event()
+
+# Worker exit code for a failed preload; gunicorn treats 3 as a boot error and stops
+MODEL_LOAD_EXIT_CODE = 3
+
+
+def models_failed():
+    return _load_failed.is_set()
+
+
+def get_scheduler():
+    """Shared scheduler; the first caller pays for TensorFlow and the model load.
+
+    A failed load is remembered, so later callers get ``ModelsUnavailable`` at once
+    instead of queueing behind another attempt that would fail the same way.
+    """
+    global _scheduler
+    if _load_failed.is_set():
+        raise ModelsUnavailable("Models failed to load")
+    with _scheduler_lock:
+        if _load_failed.is_set():
+            raise ModelsUnavailable("Models failed to load")
+        if _scheduler is None:
+            try:
+                from models.loader import get_registry
+                registry = get_registry()
+            except Exception as e:
+                _load_failed.set()
+                logging.error(f"❌ Model loading error: {e}")
+                raise ModelsUnavailable("Models failed to load") from e
+            _scheduler = InferenceScheduler(registry.image, registry.audio)
+    return _scheduler
+
+
+def start_warm_up():
+    """Load the models on a background thread so startup does not wait for them.
+
+    A preload failure ends the worker, as an import-time load error did, rather
+    than leaving it up to answer every verification with 503.
+    """
+    def _warm():
+        try:
+            get_scheduler()
+        except ModelsUnavailable:
+            logging.critical("❌ Model preload failed, stopping worker")
+            logging.shutdown()
+            os._exit(MODEL_LOAD_EXIT_CODE)
+
+    thread = threading.Thread(target=_warm, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
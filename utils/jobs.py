@@ -0,0 +1,104 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_RESULT_TTL
+
+
+class QueueFull(Exception):
+    """Raised by ``JobQueue.submit`` when the backlog limit is reached."""
+
+
+class Job:
+    """One queued verification; ``result`` is the (payload, http_status) it finished with."""
+
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+        self.status = "queued"
+        self.result = None
+        self.created = time.time()
+        self.finished = None
+        self._changed = threading.Condition()
+
+    def _set(self, status, result=None):
+        with self._changed:
+            self.status = status
+            if result is not None:
+                self.result = result
+                self.finished = time.time()
+            self._changed.notify_all()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def wait(self, seen_status, timeout):
+        """Block until the status differs from ``seen_status`` or ``timeout`` passes."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.status != seen_status, timeout=timeout)
+            return self.status
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status}
+        if self.done:
+            payload, status_code = self.result
+            data.update(result=payload, status_code=status_code)
+        return data
+
+
+class JobQueue:
+    """Runs verification jobs on a local worker pool with a bounded backlog.
+
+    Finished jobs are kept for ``ttl`` seconds so clients can poll for them.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, limit=JOB_QUEUE_LIMIT, ttl=JOB_RESULT_TTL):
+        self.limit = limit
+        self.ttl = ttl
+        self._jobs = {}
+        self._active = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def has_capacity(self):
+        """Whether a job submitted now would be accepted; ``submit`` still enforces the limit."""
+        with self._lock:
+            return self._active < self.limit
+
+    def submit(self, fn, *args):
+        """Queue ``fn(*args)``, which returns (payload, http_status); raises QueueFull when saturated."""
+        job = Job()
+        with self._lock:
+            self._expire()
+            if self._active >= self.limit:
+                raise QueueFull(f"{self._active} jobs already queued or running")
+            self._active += 1
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job._set("running")
+        try:
+            job._set("done", fn(*args))
+        except Exception as e:
+            logging.error(f"❌ Job {job.id} failed: {e}")
+            job._set("failed", ({'error': f'Unexpected server error: {e}'}, 500))
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j for j, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {'active': self._active, 'limit': self.limit, 'tracked': len(self._jobs)}
@@ -0,0 +1,166 @@
+import time
+import bisect
+import threading
+from config import METRICS_LATENCY_BUCKETS, METRICS_BATCH_BUCKETS
+
+
+# === Metric types (Prometheus text exposition, no client library) ===
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_str(self, key, extra=None):
+        pairs = list(zip(self.labels, key)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, self._snapshot(value)) for key, value in self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _snapshot(self, value):
+        return value
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{self._label_str(key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _snapshot(self, value):
+        return list(value[0]), value[1]
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{self._label_str(key, ('le', le))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_str(key)} {total}")
+        lines.append(f"{self.name}_count{self._label_str(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of this process plus gauges read from live objects at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._callbacks = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauges(self, prefix, help_text, fn):
+        """Expose every numeric entry of the dict ``fn()`` returns as ``<prefix>_<key>``."""
+        self._callbacks.append((prefix, help_text, fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help_text, fn in self._callbacks:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)):
+                    name = f"{prefix}_{key}"
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "gateway_stage_seconds", "Time spent in each pipeline stage.", ["stage"]))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "gateway_stage_errors_total", "Pipeline stages that raised.", ["stage"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "gateway_request_seconds", "HTTP request latency by endpoint.", ["endpoint", "status"]))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "gateway_in_flight_requests", "HTTP requests currently being served.", ["endpoint"]))
+VERDICTS = REGISTRY.register(Counter(
+    "gateway_verdicts_total", "Verification outcomes as recorded in the audit log.", ["status"]))
+BATCH_ROWS = REGISTRY.register(Histogram(
+    "gateway_inference_batch_rows", "Rows per model forward pass.", ["model"], buckets=METRICS_BATCH_BUCKETS))
+
+
+# === Timers ===
+class stage_timer:
+    """``with stage_timer("decode"):`` records the block's duration, and an error if it raises."""
+
+    __slots__ = ("stage", "started", "elapsed")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(self.elapsed, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
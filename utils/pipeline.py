@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from config import (DECISION_POLICY, DECISION_POLICIES, REPLAY_CHECK_ENABLED, REPLAY_MIN_FRAME_MATCHES,
+                    ALLOWED_IMAGE_EXTENSIONS)
+from utils.uploads import read_upload, read_uploads, decode_frames
+from utils.audio_decoding import decode_audio
+from utils.audio_processing import audio_inputs, predict_audio_windows
+from utils.image_processing import prepare_frames, score_prepared_frames
+from utils.decision import FrameVote, final_decision
+from utils.metrics import stage_timer
+from utils.inference import get_scheduler
+
+AUDIO_EXTENSIONS = ('.webm', '.ogg', '.wav', '.mp3')
+MIN_AUDIO_BYTES = 1000
+
+
+class VerificationContext:
+    """State of one verification, filled in stage by stage."""
+
+    def __init__(self, session_id, client_ip, folder_path, vote=None, policy=DECISION_POLICY):
+        self.session_id = session_id
+        self.client_ip = client_ip
+        self.folder_path = folder_path
+        self.images_path = os.path.join(folder_path, 'images')
+        self.policy = policy
+        self.vote = vote
+        self.client_session = None  # caller's own session id, when it has one (/verify cookie)
+        # ingest / hash
+        self.image_files = []
+        self.audio_file = None
+        self.frames = []          # one Upload per frame (None for a stream frame that never arrived)
+        self.audio = None
+        # decode / preprocess
+        self.audio_signal = None
+        self.prepared_frames = None
+        self.audio_inputs = None
+        # infer / decide
+        self.image_results = None  # preset when frames were scored as they arrived
+        self.audio_result = "FAKE"
+        self.face_result = None
+        self.final_result = None
+
+    @property
+    def audio_scorable(self):
+        return self.audio is not None and self.audio.data is not None and len(self.audio.data) >= MIN_AUDIO_BYTES
+
+    @property
+    def image_hash(self):
+        return next((u.sha256 for u in self.frames[:1] if u is not None and u.data is not None), None)
+
+    @property
+    def audio_hash(self):
+        return self.audio.sha256 if self.audio_scorable else None
+
+
+class VerificationPipeline:
+    """ingest -> hash -> decode -> preprocess -> infer -> decide -> persist, shared by every endpoint.
+
+    Each stage is one method taking the context and is timed as ``pipeline_<stage>``.
+    The face and voice halves of decode, preprocess and infer run side by side on
+    ``executor`` and share the frame vote, so the audio model is skipped once the
+    face verdict is FAKE. Override a stage to swap its implementation.
+    """
+
+    STAGES = ('decode', 'preprocess', 'infer', 'decide', 'persist')
+
+    def __init__(self, audit, replay_cache, executor, models=get_scheduler,
+                 replay_check=REPLAY_CHECK_ENABLED):
+        self.audit = audit
+        self.replay_cache = replay_cache
+        self.executor = executor
+        self.models = models
+        self.replay_check = replay_check
+
+    def context(self, session_id, client_ip, folder_path, vote=None, policy=DECISION_POLICY):
+        return VerificationContext(session_id, client_ip, folder_path, vote, policy)
+
+    # === Driver ===
+    def timed(self, stage, fn, *args):
+        timer = stage_timer(f"pipeline_{stage}")
+        try:
+            with timer:
+                return fn(*args)
+        finally:
+            logging.info(f"⏱️ {stage} stage: {timer.elapsed:.3f}s")
+
+    def receive(self, ctx, image_files, audio_file):
+        """ingest and hash; returns ``(hash, session_id, status)`` of a replayed upload, or None."""
+        self.timed('ingest', self.ingest, ctx, image_files, audio_file)
+        self.timed('hash', self.hash, ctx)
+        frame_hashes = [u.sha256 for u in ctx.frames if u is not None and u.sha256]
+        return self.find_replay(frame_hashes, ctx.audio.sha256 if ctx.audio else None)
+
+    def run(self, ctx):
+        """Every stage after the replay check; returns ``ctx`` with the verdict set."""
+        started = time.perf_counter()
+        for stage in self.STAGES:
+            self.timed(stage, getattr(self, stage), ctx)
+        logging.info(f"⏱️ Session {ctx.session_id} verified in {time.perf_counter() - started:.3f}s")
+        return ctx
+
+    def _side_by_side(self, ctx, image_half, audio_half):
+        image_future = self.executor.submit(image_half, ctx) if ctx.image_results is None else None
+        audio_result = audio_half(ctx)
+        if image_future is not None:
+            image_future.result()
+        return audio_result
+
+    # === Stages ===
+    def ingest(self, ctx, image_files, audio_file):
+        ctx.image_files = list(image_files)
+        ctx.audio_file = audio_file if audio_file and getattr(audio_file, 'filename', None) else None
+        if ctx.vote is None:
+            ctx.vote = FrameVote(len(ctx.image_files), ctx.policy)
+        logging.info(f"📥 Received {len(ctx.image_files)} images and audio: {ctx.audio_file is not None}")
+        return ctx
+
+    def hash(self, ctx):
+        # Read and hash every upload once; later stages reuse the bytes
+        ctx.frames = read_uploads(ctx.image_files)
+        ctx.audio = read_upload(ctx.audio_file) if ctx.audio_file is not None else None
+        return ctx
+
+    def decode(self, ctx):
+        def decode_audio_half(ctx):
+            if ctx.audio_scorable:
+                ctx.audio_signal = decode_audio(ctx.audio.data, audio_extension(ctx.audio))
+            elif ctx.audio is not None:
+                logging.warning("⚠️ Audio too small or empty.")
+        self._side_by_side(ctx, lambda ctx: decode_frames([u for u in ctx.frames if u is not None]),
+                           decode_audio_half)
+
+    def preprocess(self, ctx):
+        def frames_half(ctx):
+            images = [u.image if u is not None else None for u in ctx.frames]
+            ctx.prepared_frames = prepare_frames(images, ctx.vote)
+
+        def audio_half(ctx):
+            ctx.audio_inputs = audio_inputs(ctx.audio_signal)
+        self._side_by_side(ctx, frames_half, audio_half)
+
+    def infer(self, ctx):
+        def frames_half(ctx):
+            ctx.image_results = score_prepared_frames(ctx.prepared_frames, self.models().image, ctx.vote, ctx.policy)
+
+        def audio_half(ctx):
+            if ctx.audio_inputs is None:
+                ctx.audio_result = "FAKE"
+            elif not ctx.vote.should_score_audio():
+                logging.info("⏭️ Audio model skipped: face verdict already FAKE")
+                ctx.audio_result = "SKIPPED"
+            else:
+                ctx.audio_result, confidence = predict_audio_windows(self.models().audio, ctx.audio_inputs, ctx.policy)
+                logging.info(f"🧠 Audio prediction: {ctx.audio_result} "
+                             f"(confidence: {confidence:.4f}, windows: {len(ctx.audio_inputs)})")
+        self._side_by_side(ctx, frames_half, audio_half)
+
+    def decide(self, ctx):
+        ctx.face_result = ctx.vote.final()
+        ctx.final_result = final_decision(ctx.face_result, ctx.audio_result)
+
+    def persist(self, ctx):
+        os.makedirs(ctx.images_path, exist_ok=True)
+        try:
+            write_session_info(ctx)
+        except Exception as e:
+            logging.error(f"❌ Session info not saved: {e}")
+
+        records = []
+        for idx, (upload, label) in enumerate(zip(ctx.frames, ctx.image_results)):
+            if upload is None:
+                continue
+            try:
+                records.append(save_frame(idx, upload, label, ctx.images_path))
+            except Exception as e:
+                logging.error(f"❌ Image {idx} failed: {e}")
+
+        if ctx.audio is not None and ctx.audio.data is not None:
+            try:
+                audio_path = os.path.join(ctx.folder_path, f'audio{audio_extension(ctx.audio)}')
+                ctx.audio.save(audio_path)
+                logging.info(f"🎤 Audio processed: {ctx.audio_result} → {audio_path}")
+                if ctx.audio_scorable:
+                    records.append((ctx.audio.sha256, 'audio', ctx.audio_result))
+            except Exception as e:
+                logging.error(f"❌ Audio error: {e}")
+
+        # Queued; the writer stores the access row and every file hash in one transaction
+        self.audit.log_verification(
+            session_id=ctx.session_id,
+            ip_address=ctx.client_ip,
+            face_result=ctx.face_result,
+            audio_result=ctx.audio_result,
+            image_hash=ctx.image_hash,
+            audio_hash=ctx.audio_hash,
+            status="success" if ctx.final_result == "REAL" else "denied",
+            file_hashes=records
+        )
+        for file_hash, _, status in records:
+            self.replay_cache.add(file_hash, ctx.session_id, status)
+
+    # === Frames scored on arrival (streaming) ===
+    def score_frame(self, upload, vote):
+        decode_frames([upload])
+        prepared = prepare_frames([upload.image], vote)
+        return score_prepared_frames(prepared, self.models().image, vote, vote.policy)[0]
+
+    # === Replays and failures ===
+    def find_replay(self, frame_hashes, audio_hash=None, expected_frames=None):
+        # Logins with fewer frames than REPLAY_MIN_FRAME_MATCHES need all of them to match
+        if not self.replay_check:
+            return None
+        expected = expected_frames or len(set(frame_hashes))
+        return self.replay_cache.find_replay(frame_hashes, audio_hash,
+                                             max(1, min(REPLAY_MIN_FRAME_MATCHES, expected)))
+
+    def record_replay(self, ctx, replay):
+        file_hash, previous_session, previous_status = replay
+        logging.warning(f"🔁 Replayed upload {file_hash} (first seen in session {previous_session}, {previous_status})")
+        self.audit.log_verification(
+            session_id=ctx.session_id,
+            ip_address=ctx.client_ip,
+            face_result="SKIPPED",
+            audio_result="SKIPPED",
+            image_hash=None,
+            audio_hash=None,
+            status="replay",
+            error_message=f"Upload {file_hash} already seen in session {previous_session}"
+        )
+
+    def record_error(self, ctx, error_msg):
+        self.audit.log_verification(
+            session_id=ctx.session_id,
+            ip_address=ctx.client_ip,
+            face_result="UNKNOWN",
+            audio_result="UNKNOWN",
+            image_hash=None,
+            audio_hash=None,
+            status="error",
+            error_message=error_msg
+        )
+
+
+def write_session_info(ctx):
+    """session.json: which decision policy the verdict used (for rescore.py) and the client session."""
+    policy = next((name for name, p in DECISION_POLICIES.items() if p == ctx.policy), None)
+    with open(os.path.join(ctx.folder_path, 'session.json'), 'w') as f:
+        json.dump({'policy': policy, 'client_session': ctx.client_session}, f)
+
+
+def audio_extension(upload):
+    return upload.ext if upload.ext in AUDIO_EXTENSIONS else '.webm'
+
+
+def save_frame(idx, upload, label, images_path):
+    if upload.data is None:
+        raise ValueError("Upload could not be read")
+    ext = upload.ext if upload.ext.lstrip('.') in ALLOWED_IMAGE_EXTENSIONS else '.jpg'
+    img_filename = f'image_{idx}_{int(datetime.now().timestamp())}{ext}'
+    img_path = os.path.join(images_path, img_filename)
+    upload.save(img_path)
+    logging.info(f"🖼️ Image {idx} saved: {label} → {img_path}")
+    return (upload.sha256, 'image', label)
@@ -0,0 +1,112 @@
+import functools
+import threading
+import numpy as np
+import cv2
+from config import IMAGE_INPUT_SIZE
+
+# Pillow's GaussianBlur(0.3) is three extended-box passes per axis in 24-bit fixed point
+_BLUR_RADIUS = 0.3
+_BLUR_PASSES = 3
+_BLUR_BITS = 24
+
+_buffers = threading.local()
+
+
+def _thread_buffer(name, shape, dtype):
+    """Per-thread scratch array reused across requests, grown only when a larger batch arrives."""
+    buf = getattr(_buffers, name, None)
+    if buf is None or buf.shape[0] < shape[0] or buf.shape[1:] != shape[1:]:
+        buf = np.empty(shape, dtype=dtype)
+        setattr(_buffers, name, buf)
+    return buf[:shape[0]]
+
+
+# === Decode boundary: one RGB conversion + resize per frame into the stack ===
+def resize_frames(pil_imgs, size=IMAGE_INPUT_SIZE):
+    # Pillow's antialiased bicubic is kept here: it is already vectorized C and
+    # cv2's interpolations do not reproduce it, which would shift model scores
+    width, height = size
+    out = np.empty((len(pil_imgs), height, width, 3), dtype=np.uint8)
+    for i, img in enumerate(pil_imgs):
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        out[i] = np.asarray(img.resize(size))
+    return out
+
+
+# === Histogram equalization on luma ===
+def equalize_batch(batch):
+    n, h, w, _ = batch.shape
+    # Colour conversion is per pixel, so the whole stack goes through cv2 as one tall image
+    yuv = cv2.cvtColor(batch.reshape(n * h, w, 3), cv2.COLOR_RGB2YUV).reshape(n, h, w, 3)
+    for frame in yuv:
+        frame[:, :, 0] = cv2.equalizeHist(np.ascontiguousarray(frame[:, :, 0]))
+    return cv2.cvtColor(yuv.reshape(n * h, w, 3), cv2.COLOR_YUV2RGB).reshape(n, h, w, 3)
+
+
+# === Gaussian blur: Pillow's extended box filter ===
+@functools.lru_cache(maxsize=8)
+def _box_delta_kernel(sigma, passes):
+    # Pillow derives the box radius and weights in float32; mirror that exactly
+    f = np.float32
+    sigma2 = f(sigma) * f(sigma) / f(passes)
+    L = np.sqrt(sigma2 * f(12) + f(1))
+    l = np.floor((L - f(1)) / f(2))
+    a = (f(2) * l + f(1)) * (l * (l + f(1)) - f(3) * sigma2)
+    a /= f(6) * (sigma2 - (l + f(1)) * (l + f(1)))
+    radius = l + a
+
+    ww = int(f(1 << _BLUR_BITS) / (radius * f(2) + f(1)))
+    fw = ((1 << _BLUR_BITS) - ww) // 2
+    # For a sub-pixel box with ww + 2*fw == 2**24, one pass is
+    # x + round(fw * (left + right - 2x) / 2**24); cv2 computes that rounding
+    # exactly for every (left, x, right) triple when writing 16-bit output
+    if radius >= 1 or ww + 2 * fw != 1 << _BLUR_BITS:
+        raise ValueError(f"blur sigma {sigma} is not a sub-pixel box filter")
+    return np.array([[fw, -2 * fw, fw]], dtype=np.float64) / (1 << _BLUR_BITS)
+
+
+def _box_passes(image, kernel, passes):
+    """Horizontal box passes over an (H, W, 3) uint8 image, rounding to uint8 after each like Pillow."""
+    for _ in range(passes):
+        delta = cv2.filter2D(image, cv2.CV_16S, kernel, borderType=cv2.BORDER_REPLICATE)
+        image = cv2.add(image, delta, dtype=cv2.CV_8U)
+    return image
+
+
+def blur_batch(batch, sigma=_BLUR_RADIUS, passes=_BLUR_PASSES):
+    """Bit-identical ``ImageFilter.GaussianBlur(sigma)`` on each frame of an (N, H, W, 3) stack."""
+    kernel = _box_delta_kernel(sigma, passes)
+    out = np.empty_like(batch)
+    # Frame at a time keeps the working set in cache; vertical passes run on the transpose
+    for i, frame in enumerate(batch):
+        frame = _box_passes(frame, kernel, passes)
+        frame = _box_passes(cv2.transpose(frame), kernel, passes)
+        out[i] = cv2.transpose(frame)
+    return out
+
+
+# === Full chain ===
+def preprocess_batch(pil_imgs, size=IMAGE_INPUT_SIZE):
+    """Decoded frames -> (N, H, W, 3) uint8 stack equivalent to preprocess_image per frame."""
+    if not pil_imgs:
+        return np.zeros((0, size[1], size[0], 3), dtype=np.uint8)
+    return blur_batch(equalize_batch(resize_frames(pil_imgs, size)))
+
+
+def tta_batch(frames):
+    """[base, flipped, bright] float32 model input for a uint8 frame stack.
+
+    Written into a per-thread buffer that is reused across requests; the
+    returned array is only valid until the same thread calls this again.
+    """
+    n = len(frames)
+    batch = _thread_buffer("tta", (3 * n,) + frames.shape[1:], np.float32)
+
+    base, flipped, bright = batch[:n], batch[n:2 * n], batch[2 * n:]
+    np.copyto(base, frames)
+    np.divide(base, np.float32(255.0), out=base)
+    np.copyto(flipped, base[:, :, ::-1])
+    np.multiply(base, np.float32(1.1), out=bright)
+    np.clip(bright, 0, 1, out=bright)
+    return batch
@@ -0,0 +1,138 @@
+import math
+import logging
+import threading
+from collections import OrderedDict
+from config import (REPLAY_BLOOM_CAPACITY, REPLAY_BLOOM_ERROR_RATE, REPLAY_LRU_SIZE,
+                    REPLAY_TRUST_BLOOM_MISSES, REPLAY_MIN_FRAME_MATCHES)
+from utils.database import get_file_hashes, iter_file_hashes
+
+
+class BloomFilter:
+    """Bit array membership filter keyed on SHA-256 hex digests.
+
+    The digests are already uniformly distributed, so the k bit positions are
+    read straight out of the hash instead of re-hashing.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, hex_digest):
+        value = int(hex_digest, 16)
+        # Double hashing from the two 128-bit halves of the digest
+        h1, h2 = value >> 128, (value & ((1 << 128) - 1)) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.k)]
+
+    def add(self, hex_digest):
+        for pos in self._positions(hex_digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, hex_digest):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(hex_digest))
+
+
+class ReplayCache:
+    """Known upload hashes, checked before any model runs.
+
+    Hashes are looked up in the LRU of recent hashes, and the rest of a request's
+    hashes in ``file_hashes`` with one query, so a replay sent to another worker
+    is still caught. In a single-worker deployment (``trust_misses``) a Bloom
+    filter of every known hash, warmed in the background, answers "definitely
+    new" without touching SQLite; otherwise no filter is built or warmed.
+    """
+
+    def __init__(self, capacity=REPLAY_BLOOM_CAPACITY, error_rate=REPLAY_BLOOM_ERROR_RATE,
+                 lru_size=REPLAY_LRU_SIZE, trust_misses=REPLAY_TRUST_BLOOM_MISSES):
+        self._bloom = BloomFilter(capacity, error_rate) if trust_misses else None
+        self._recent = OrderedDict()
+        self._lru_size = lru_size
+        self.trust_misses = trust_misses
+        self._warmed = threading.Event()
+        self._lock = threading.Lock()
+
+    def warm_load(self, chunk_size=5000):
+        # Only the Bloom filter is filled; the LRU keeps the hashes seen by this process
+        count = 0
+        chunk = []
+        for row in iter_file_hashes():
+            chunk.append(row['file_hash'])
+            if len(chunk) >= chunk_size:
+                count += self._add_to_bloom(chunk)
+                chunk = []
+        count += self._add_to_bloom(chunk)
+        self._warmed.set()
+        logging.info(f"✅ Replay cache warmed with {count} known hashes")
+        return count
+
+    def start_warm_load(self):
+        """Warm the filter on a background thread so worker startup does not wait for it.
+
+        Does nothing without a filter (misses are not trusted).
+        """
+        if self._bloom is None:
+            return None
+
+        def run():
+            try:
+                self.warm_load()
+            except Exception as e:
+                logging.error(f"❌ Replay cache warm-up failed: {e}")
+        thread = threading.Thread(target=run, name="replay-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _add_to_bloom(self, file_hashes):
+        with self._lock:
+            for file_hash in file_hashes:
+                self._bloom.add(file_hash)
+        return len(file_hashes)
+
+    def _remember(self, file_hash, session_id, status):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(file_hash)
+            self._recent[file_hash] = (session_id, status)
+            self._recent.move_to_end(file_hash)
+            if len(self._recent) > self._lru_size:
+                self._recent.popitem(last=False)
+
+    def add(self, file_hash, session_id, status):
+        if file_hash:
+            self._remember(file_hash, session_id, status)
+
+    def lookup_many(self, file_hashes):
+        """{hash: (session_id, status)} for each of ``file_hashes`` seen before."""
+        hits, unknown = {}, []
+        with self._lock:
+            filtered = self._bloom is not None and self._warmed.is_set()
+            for file_hash in dict.fromkeys(h for h in file_hashes if h):
+                hit = self._recent.get(file_hash)
+                if hit is not None:
+                    self._recent.move_to_end(file_hash)
+                    hits[file_hash] = hit
+                elif not filtered or file_hash in self._bloom:
+                    unknown.append(file_hash)
+        for row in get_file_hashes(unknown):
+            self._remember(row['file_hash'], row['session_id'], row['status'])
+            hits[row['file_hash']] = (row['session_id'], row['status'])
+        return hits
+
+    def lookup(self, file_hash):
+        """(session_id, status) of the earlier upload with this hash, or None."""
+        return self.lookup_many([file_hash]).get(file_hash)
+
+    def find_replay(self, frame_hashes, audio_hash=None, min_frame_matches=REPLAY_MIN_FRAME_MATCHES):
+        """(hash, session_id, status) of the replayed upload, or None.
+
+        A replay is a previously seen audio clip, or at least ``min_frame_matches``
+        distinct previously seen frames.
+        """
+        hits = self.lookup_many(list(frame_hashes) + [audio_hash])
+        if audio_hash in hits:
+            return (audio_hash, *hits[audio_hash])
+        seen = [h for h in dict.fromkeys(frame_hashes) if h in hits]
+        if seen and len(seen) >= min_frame_matches:
+            return (seen[0], *hits[seen[0]])
+        return None
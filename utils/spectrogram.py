@@ -0,0 +1,149 @@
+import functools
+import threading
+import numpy as np
+from PIL import Image
+from config import AUDIO_IMAGE_SIZE, AUDIO_SAMPLE_RATE
+
+# librosa.feature.melspectrogram / power_to_db defaults the model was trained with
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+AMIN = 1e-10
+TOP_DB = 80.0
+
+# Pixel size of the axes area in the legacy 3x3 inch / 100 dpi figure after
+# tight_layout and bbox_inches='tight' cropping (what audio_spec.png contained)
+SPEC_RENDER_SIZE = (270, 270)
+SPEC_COLORMAP = "magma"
+
+
+_buffers = threading.local()
+
+
+# === Cached analysis basis (built once per process) ===
+@functools.lru_cache(maxsize=None)
+def stft_window(n_fft=N_FFT):
+    # Periodic Hann, i.e. scipy.signal.get_window('hann', n_fft, fftbins=True)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+def _hz_to_mel(freqs):
+    # Slaney scale: linear below 1 kHz, logarithmic above
+    freqs = np.asarray(freqs, dtype=np.float64)
+    f_sp, min_log_hz, logstep = 200.0 / 3, 1000.0, np.log(6.4) / 27.0
+    mels = freqs / f_sp
+    log_t = freqs >= min_log_hz
+    mels[log_t] = min_log_hz / f_sp + np.log(freqs[log_t] / min_log_hz) / logstep
+    return mels
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    f_sp, min_log_hz, logstep = 200.0 / 3, 1000.0, np.log(6.4) / 27.0
+    min_log_mel = min_log_hz / f_sp
+    freqs = f_sp * mels
+    log_t = mels >= min_log_mel
+    freqs[log_t] = min_log_hz * np.exp(logstep * (mels[log_t] - min_log_mel))
+    return freqs
+
+
+@functools.lru_cache(maxsize=None)
+def mel_basis(sr=AUDIO_SAMPLE_RATE, n_fft=N_FFT, n_mels=N_MELS):
+    """(n_mels, 1 + n_fft // 2) Slaney-normalized triangular filters, as librosa.filters.mel builds."""
+    fftfreqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    mel_f = _mel_to_hz(np.linspace(_hz_to_mel(np.array([0.0]))[0], _hz_to_mel(np.array([sr / 2.0]))[0], n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = mel_f[:, None] - fftfreqs[None, :]
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper)).astype(np.float32)
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None].astype(np.float32)
+    weights.flags.writeable = False
+    return weights
+
+
+# === Batched STFT -> mel power -> dB ===
+def _windowed_buffer(shape):
+    """Per-thread scratch for the windowed frames, reused across requests."""
+    buf = getattr(_buffers, 'frames', None)
+    if buf is None or buf.size < np.prod(shape):
+        buf = np.empty(int(np.prod(shape)), dtype=np.float32)
+        _buffers.frames = buf
+    return buf[:int(np.prod(shape))].reshape(shape)
+
+
+def mel_power_batch(signals, sr=AUDIO_SAMPLE_RATE):
+    """(B, L) equal-length signals -> (B, n_mels, frames) mel power, center=True with zero padding."""
+    y = np.asarray(signals, dtype=np.float32)
+    padded = np.pad(y, [(0, 0), (N_FFT // 2, N_FFT // 2)])
+    frames = np.lib.stride_tricks.sliding_window_view(padded, N_FFT, axis=-1)[:, ::HOP_LENGTH]
+    windowed = _windowed_buffer(frames.shape)
+    np.multiply(frames, stft_window(), out=windowed)
+    spectrum = np.fft.rfft(windowed, axis=-1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    # (n_mels, F) @ (B, F, T) -> (B, n_mels, T)
+    return np.matmul(mel_basis(sr), power.transpose(0, 2, 1).astype(np.float32, copy=False))
+
+
+def power_to_db(S):
+    """librosa.power_to_db(S, ref=np.max, top_db=80), per clip over the leading axis."""
+    axes = (-2, -1)
+    log_spec = 10.0 * np.log10(np.maximum(AMIN, S))
+    log_spec -= 10.0 * np.log10(np.maximum(AMIN, S.max(axis=axes, keepdims=True)))
+    return np.maximum(log_spec, log_spec.max(axis=axes, keepdims=True) - TOP_DB)
+
+
+def mel_spectrogram_db(y, sr=AUDIO_SAMPLE_RATE):
+    """dB mel spectrogram of one clip; matches librosa melspectrogram + power_to_db(ref=np.max)."""
+    return power_to_db(mel_power_batch(np.asarray(y)[None], sr))[0]
+
+
+# === Colormap lookup table ===
+@functools.lru_cache(maxsize=None)
+def colormap_lut(name=SPEC_COLORMAP):
+    from matplotlib import colormaps
+    cmap = colormaps[name]
+    rgba = cmap(np.arange(cmap.N))
+    return (rgba[:, :3] * 255 + 0.5).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=None)
+def _pixel_grid(n_rows, n_cols, height, width):
+    # Nearest quad under each pixel centre; rows are flipped because specshow
+    # draws low frequencies at the bottom
+    rows = np.floor((np.arange(height) + 0.5) * n_rows / height).astype(np.intp)[::-1]
+    cols = np.floor((np.arange(width) + 0.5) * n_cols / width).astype(np.intp)
+    return np.ix_(rows, cols)
+
+
+# === Render dB spectrogram to RGB pixels ===
+def render_spectrogram(S_DB, size=SPEC_RENDER_SIZE):
+    """Rasterize a dB spectrogram exactly like specshow + savefig, without pyplot."""
+    lut = colormap_lut()
+    n_colors = len(lut)
+
+    lo, hi = S_DB.min(), S_DB.max()
+    if hi > lo:
+        norm = (S_DB - lo) / (hi - lo)
+    else:
+        norm = np.zeros_like(S_DB)
+    idx = np.clip((norm * n_colors).astype(np.intp), 0, n_colors - 1)
+
+    width, height = size
+    return lut[idx[_pixel_grid(S_DB.shape[0], S_DB.shape[1], height, width)]]
+
+
+# === Model input tensor ===
+def spectrogram_tensor(S_DB):
+    """Same 224x224x3 input predict_audio built from audio_spec.png, kept in memory."""
+    pixels = render_spectrogram(S_DB)
+    img = Image.fromarray(pixels).resize(AUDIO_IMAGE_SIZE)
+    return np.asarray(img) / 255.0
+
+
+def spectrogram_batch(signals, sr=AUDIO_SAMPLE_RATE):
+    """(B, 224, 224, 3) model inputs for B equal-length clips, with one STFT over the whole batch."""
+    S_DB = power_to_db(mel_power_batch(signals, sr))
+    return np.stack([spectrogram_tensor(s) for s in S_DB])
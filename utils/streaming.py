@@ -0,0 +1,138 @@
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import wait
+from config import (
+    STREAM_SESSION_TTL, STREAM_MAX_FRAMES, STREAM_MAX_SESSIONS, STREAM_MAX_SESSION_MB,
+    MAX_AUDIO_SIZE_MB, DECISION_POLICY
+)
+from utils.decision import FrameVote
+from utils.uploads import Upload
+
+
+class TooManyStreams(Exception):
+    """Raised by ``StreamSessionStore.open`` when the open-session limit is reached."""
+
+
+class StreamTooLarge(Exception):
+    """Raised when a frame or audio chunk would exceed the session's byte budget."""
+
+
+class StreamSession:
+    """One verification whose frames and audio arrive as separate requests.
+
+    Frames are scored as soon as they arrive (the futures are kept so ``finish``
+    can wait for them and hand the rest to the pipeline); audio chunks are
+    appended and hashed incrementally.
+    """
+
+    def __init__(self, session_id, client_ip, expected_frames, folder_path, images_path,
+                 policy=DECISION_POLICY):
+        self.session_id = session_id
+        self.client_ip = client_ip
+        self.expected_frames = expected_frames
+        self.folder_path = folder_path
+        self.images_path = images_path
+        self.vote = FrameVote(expected_frames, policy)
+        self.created = time.monotonic()
+        self.frame_futures = {}
+        self.frame_hashes = []
+        self.bytes_received = 0
+        self.audio_filename = None
+        self._audio = bytearray()
+        self._audio_sha256 = hashlib.sha256()
+        self._lock = threading.Lock()
+
+    # === Frames ===
+    def add_frame(self, index, upload, submit):
+        """Register frame ``index`` and start scoring it via ``submit()``, which returns a future."""
+        with self._lock:
+            if not 0 <= index < self.expected_frames:
+                raise ValueError(f"Frame index {index} outside 0..{self.expected_frames - 1}")
+            if index in self.frame_futures:
+                raise ValueError(f"Frame {index} already received")
+            self._reserve(len(upload.data))
+            self.frame_hashes.append(upload.sha256)
+            self.frame_futures[index] = submit()
+
+    def frame_results(self):
+        """Block until every received frame is scored; returns labels and uploads by index.
+
+        Missing frames count as FAKE and have no upload.
+        """
+        wait(list(self.frame_futures.values()))
+        results = ["FAKE"] * self.expected_frames
+        uploads = [None] * self.expected_frames
+        for index, future in self.frame_futures.items():
+            try:
+                label, upload = future.result()
+            except Exception as e:
+                logging.error(f"❌ Stream frame {index} failed: {e}")
+                continue
+            results[index] = label
+            uploads[index] = upload
+        return results, uploads
+
+    # === Audio ===
+    def add_audio_chunk(self, filename, data):
+        with self._lock:
+            if len(self._audio) + len(data) > MAX_AUDIO_SIZE_MB * 1024 * 1024:
+                raise StreamTooLarge("Audio stream exceeds the size limit")
+            self._reserve(len(data))
+            if self.audio_filename is None:
+                self.audio_filename = filename
+            self._audio.extend(data)
+            self._audio_sha256.update(data)
+            return len(self._audio)
+
+    def _reserve(self, size):
+        # Caller holds the lock
+        if self.bytes_received + size > STREAM_MAX_SESSION_MB * 1024 * 1024:
+            raise StreamTooLarge("Stream session exceeds the size limit")
+        self.bytes_received += size
+
+    def audio_upload(self):
+        with self._lock:
+            if not self._audio:
+                return None
+            return Upload(self.audio_filename, bytes(self._audio), self._audio_sha256.hexdigest())
+
+
+class StreamSessionStore:
+    """Open stream sessions of this process; abandoned ones expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl=STREAM_SESSION_TTL, limit=STREAM_MAX_SESSIONS):
+        self.ttl = ttl
+        self.limit = limit
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for session_id in [s for s, stream in self._sessions.items() if stream.created < cutoff]:
+            del self._sessions[session_id]
+            logging.info(f"⌛ Stream session {session_id} expired")
+
+    def open(self, session_id, client_ip, expected_frames, folder_path, images_path):
+        expected_frames = max(1, min(int(expected_frames), STREAM_MAX_FRAMES))
+        stream = StreamSession(session_id, client_ip, expected_frames, folder_path, images_path)
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.limit:
+                raise TooManyStreams(f"{len(self._sessions)} stream sessions already open")
+            self._sessions[session_id] = stream
+        return stream
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'open': len(self._sessions), 'limit': self.limit}
@@ -0,0 +1,63 @@
+import io
+import os
+import hashlib
+from PIL import Image
+from utils.metrics import stage_timer
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Upload:
+    """One uploaded file read exactly once: raw bytes, their SHA-256 and (for frames) the decoded image."""
+
+    def __init__(self, filename, data, sha256, image=None):
+        self.filename = filename
+        self.data = data
+        self.sha256 = sha256
+        self.image = image
+
+    @property
+    def ext(self):
+        return os.path.splitext(self.filename or '')[1].lower()
+
+    def save(self, path):
+        # Original bytes as received; no re-encode, so the stored file matches the hash
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+
+# === Read + hash in one pass ===
+def read_upload(file_storage):
+    with stage_timer("hash"):
+        sha256 = hashlib.sha256()
+        buffer = io.BytesIO()
+        stream = file_storage.stream
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+            buffer.write(chunk)
+        return Upload(file_storage.filename, buffer.getvalue(), sha256.hexdigest())
+
+
+def read_uploads(files):
+    uploads = []
+    for file_storage in files:
+        try:
+            uploads.append(read_upload(file_storage))
+        except Exception:
+            uploads.append(Upload(getattr(file_storage, 'filename', None), None, None))
+    return uploads
+
+
+# === Frames: decode once ===
+def decode_frames(uploads):
+    with stage_timer("decode_frames"):
+        for upload in uploads:
+            if upload.data is None or upload.image is not None:
+                continue
+            try:
+                upload.image = Image.open(io.BytesIO(upload.data))
+                upload.image.load()
+            except Exception:
+                upload.image = None
+    return uploads
@@ -0,0 +1,86 @@
+import numpy as np
+from config import (
+    AUDIO_SAMPLE_RATE, AUDIO_DURATION, AUDIO_MAX_WINDOWS,
+    VAD_FRAME_MS, VAD_THRESHOLD_DB, VAD_MIN_LEVEL_DB, VAD_MIN_SPEECH_MS, VAD_MAX_GAP_MS, VAD_PAD_MS,
+    VAD_MIN_SCORED_MS
+)
+
+
+# === Energy-based voice activity detection ===
+def frame_levels(y, sr=AUDIO_SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+    """RMS level in dBFS of consecutive non-overlapping frames, and the frame length in samples."""
+    n = max(1, int(sr * frame_ms / 1000))
+    count = len(y) // n
+    frames = np.asarray(y[:count * n], dtype=np.float32).reshape(count, n)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20 * np.log10(rms), n
+
+
+def speech_segments(y, sr=AUDIO_SAMPLE_RATE):
+    """(start, end) sample ranges of speech, padded by VAD_PAD_MS and with short gaps bridged.
+
+    A frame is speech when it is VAD_THRESHOLD_DB above the clip's noise floor
+    (its 10th percentile level) and above VAD_MIN_LEVEL_DB.
+    """
+    levels, n = frame_levels(y, sr)
+    if len(levels) == 0:
+        return []
+    threshold = max(np.percentile(levels, 10) + VAD_THRESHOLD_DB, VAD_MIN_LEVEL_DB)
+    active = (levels > threshold).astype(np.int8)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], active, [0]))))
+    runs = edges.reshape(-1, 2).tolist()
+
+    max_gap = VAD_MAX_GAP_MS / VAD_FRAME_MS
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_len = VAD_MIN_SPEECH_MS / VAD_FRAME_MS
+    pad = int(sr * VAD_PAD_MS / 1000)
+    return [(max(0, start * n - pad), min(len(y), end * n + pad))
+            for start, end in merged if end - start >= min_len]
+
+
+# === Window selection ===
+def select_windows(y, segments, sr=AUDIO_SAMPLE_RATE, max_windows=AUDIO_MAX_WINDOWS):
+    """Up to ``max_windows`` equal-length AUDIO_DURATION windows covering the most speech.
+
+    Clips no longer than one window give a single window starting at the first
+    speech onset (leading silence trimmed), but never shorter than
+    VAD_MIN_SCORED_MS so the spectrogram is not stretched far beyond what the
+    model was trained on. Without detected speech the first window is returned
+    unchanged so a quiet microphone is still scored.
+    """
+    window = int(AUDIO_DURATION * sr)
+    if not segments:
+        return [y[:window]]
+    if len(y) <= window:
+        min_len = int(sr * VAD_MIN_SCORED_MS / 1000)
+        return [y[max(0, min(segments[0][0], len(y) - min_len)):]]
+
+    speech = np.zeros(len(y) + 1, dtype=np.int64)
+    for start, end in segments:
+        speech[start + 1:end + 1] = 1
+    covered = np.cumsum(speech)
+
+    last_start = len(y) - window
+    candidates = sorted({min(s, last_start)
+                         for start, end in segments
+                         for s in range(start, max(start + 1, end - window // 2), window // 2)})
+    coverage = {s: covered[s + window] - covered[s] for s in candidates}
+
+    chosen = []
+    for s in sorted(candidates, key=lambda c: -coverage[c]):
+        if len(chosen) >= max_windows:
+            break
+        # Windows may overlap by at most half their length
+        if all(abs(s - c) >= window // 2 for c in chosen):
+            chosen.append(s)
+    return [y[s:s + window] for s in sorted(chosen)]
+
+
+def speech_windows(y, sr=AUDIO_SAMPLE_RATE, max_windows=AUDIO_MAX_WINDOWS):
+    return select_windows(y, speech_segments(y, sr), sr, max_windows)